@@ -0,0 +1,99 @@
+"""
+Микробенчмарк задержки "решение -> байты в сокете" для OrderSubmitter
+
+python bench_order_latency.py [итераций] [--live]
+  --live - дополнительно замерить RTT прогретой сессии против нового соединения
+"""
+
+import json
+import statistics
+import sys
+import time
+
+import requests
+from eth_account import Account
+from hyperliquid.utils import constants
+from hyperliquid.utils.signing import order_request_to_order_wire, order_wires_to_order_action, sign_l1_action, get_timestamp_ms
+from order_submitter import OrderSubmitter
+
+
+def report(name: str, samples_us):
+    samples_us = sorted(samples_us)
+    p50 = statistics.median(samples_us)
+    p99 = samples_us[int(len(samples_us) * 0.99) - 1]
+    print(f"  {name:<28} p50 {p50:9.1f} us   p99 {p99:9.1f} us")
+
+
+def bench_offline(n: int):
+    # Подпись не зависит от реального ключа - берем случайный
+    wallet = Account.create()
+    submitter = OrderSubmitter(wallet)
+    submitter.assets = {"ETH": (1, 4)}
+    order_type = {"limit": {"tif": "Ioc"}}
+
+    build, sign, encode, total = [], [], [], []
+    sdk_total = []
+
+    for i in range(n):
+        px = 3000.0 + (i % 100) * 0.37
+        sz = 0.0123 + (i % 7) * 0.001
+
+        t0 = time.perf_counter()
+        action = submitter.build_order_action("ETH", False, sz, px, order_type, reduce_only=False)
+        t1 = time.perf_counter()
+        payload = submitter.sign(action)
+        t2 = time.perf_counter()
+        json.dumps(payload)
+        t3 = time.perf_counter()
+
+        build.append((t1 - t0) * 1e6)
+        sign.append((t2 - t1) * 1e6)
+        encode.append((t3 - t2) * 1e6)
+        total.append((t3 - t0) * 1e6)
+
+        # Тот же ордер через путь SDK (float_to_wire, name_to_asset уже известен)
+        t0 = time.perf_counter()
+        wire = order_request_to_order_wire({
+            "coin": "ETH", "is_buy": False, "sz": round(sz, 4), "limit_px": round(px, 1),
+            "order_type": order_type, "reduce_only": False,
+        }, 1)
+        sdk_action = order_wires_to_order_action([wire])
+        sign_l1_action(wallet, sdk_action, None, get_timestamp_ms(), None, True)
+        sdk_total.append((time.perf_counter() - t0) * 1e6)
+
+    print(f"Офлайн, {n} ордеров:")
+    report("quantize + wire", build)
+    report("sign", sign)
+    report("json encode", encode)
+    report("OrderSubmitter total", total)
+    report("SDK wire + sign", sdk_total)
+
+
+def bench_network(n: int):
+    submitter = OrderSubmitter(Account.create())
+    submitter.load_meta()
+    payload = {"type": "allMids"}
+
+    warm, cold = [], []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        submitter._post("/info", payload)
+        warm.append((time.perf_counter() - t0) * 1e6)
+
+        t0 = time.perf_counter()
+        requests.post(constants.MAINNET_API_URL + "/info", json=payload, timeout=10)
+        cold.append((time.perf_counter() - t0) * 1e6)
+
+    print(f"Сеть, {n} запросов /info:")
+    report("прогретая сессия", warm)
+    report("новое соединение", cold)
+    submitter.stop()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 1000
+
+    bench_offline(n)
+    if "--live" in sys.argv:
+        bench_network(min(n, 50))
@@ -0,0 +1,2 @@
+# test_subaccount.py - ручной скрипт реальной торговли на mainnet, а не тест
+collect_ignore = ["test_subaccount.py"]
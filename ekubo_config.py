@@ -1,6 +1,7 @@
 from web3 import Web3
 
 POSITIONS_CONTRACT = Web3.to_checksum_address("0xA37cc341634AFD9E0919D334606E676dbAb63E17")
+CORE_CONTRACT = Web3.to_checksum_address("0xe0e0e08A6A4b9Dc7bD67BCB7aadE5cF48157d444")
 CORE_DATA_FETCHER = Web3.to_checksum_address("0x208bb00c6b142351e4a431f6dd323691ebb7c285")
 
 POSITION_ID = 260402423176691249624209280105618583771
@@ -0,0 +1,328 @@
+"""
+Индексатор событий позиции Ekubo: чанкованный eth_getLogs -> локальная SQLite таблица
+
+python ekubo_indexer.py sync          - догнать голову цепи
+python ekubo_indexer.py follow [сек]  - догонять голову постоянно
+python ekubo_indexer.py at <блок>     - состояние позиции на блоке (локальный запрос)
+"""
+
+import json
+import os
+from collections.abc import Mapping
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from dotenv import load_dotenv
+from ekubo_config import *
+
+load_dotenv()
+
+INDEX_DB = os.getenv("EKUBO_INDEX_DB", "ekubo_index.sqlite")
+# Только события позиций Core (PositionUpdated, PositionFeesCollected) - свопы не запрашиваются
+CORE_ABI_PATH = "ABI/CoreAbi.json"
+
+# Фрагменты ошибок провайдеров, означающие "слишком большой диапазон/ответ".
+# Лимиты частоты запросов (-32005, "limit exceeded", "too many requests") сюда не входят - их лечит повтор
+TOO_LARGE_ERRORS = (
+    "query returned more than",
+    "block range",
+    "range is too large",
+    "response size",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT,
+    topic0 TEXT,
+    topics TEXT NOT NULL,
+    data TEXT NOT NULL,
+    args TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_events_event_block ON events (event, block_number);
+CREATE INDEX IF NOT EXISTS idx_events_address_block ON events (address, block_number);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_block INTEGER NOT NULL
+);
+"""
+
+
+class RangeTooLarge(Exception):
+    pass
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(value)
+    if isinstance(value, int) and not isinstance(value, bool) and abs(value) >= 2**53:
+        # Большие uint/int не теряют точность в JSON
+        return str(value)
+    if isinstance(value, Mapping):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def _find_arg(args, name):
+    """Поиск поля в (вложенных) аргументах события: params.liquidityDelta и т.п."""
+    if isinstance(args, Mapping):
+        if name in args:
+            return args[name]
+        for v in args.values():
+            found = _find_arg(v, name)
+            if found is not None:
+                return found
+    return None
+
+
+class EkuboIndexer:
+
+    def __init__(self, w3: Web3 = None, db_path: str = INDEX_DB, workers: int = 4,
+                 chunk: int = 2000, min_chunk: int = 10, max_chunk: int = 50000, confirmations: int = 12):
+        self.w3 = w3 or Web3(Web3.HTTPProvider(os.getenv("ETHEREUM_RPC_URL")))
+        self.workers = workers
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.chunk = chunk
+        self.confirmations = confirmations
+
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+
+        self.position_word = POSITION_ID.to_bytes(32, "big")
+        self.decoders = {}  # topic0 -> событие контракта для process_log
+        self._add_decoders(POSITIONS_CONTRACT, "ABI/PositionsABI.json")
+        # Ликвидность, депозиты/выводы и комиссии приходят событиями Core
+        self.core_topics = self._add_decoders(CORE_CONTRACT, CORE_ABI_PATH)
+
+    def _add_decoders(self, address, abi_path):
+        """Зарегистрировать события ABI. Возвращает их topic0"""
+        with open(abi_path, "r") as f:
+            abi = json.load(f)
+        contract = self.w3.eth.contract(address=address, abi=abi)
+        topics = []
+        for item in abi:
+            if item.get("type") == "event":
+                topic = Web3.to_hex(event_abi_to_log_topic(item))
+                self.decoders[topic] = getattr(contract.events, item["name"])()
+                topics.append(topic)
+        return topics
+
+    # ---------- Загрузка логов ----------
+
+    def _log_filters(self, from_block, to_block):
+        # NFT позиции: Transfer/Approval с id в третьем индексированном топике
+        # Core: события позиций всех пулов (salt не индексирован), наш id отбирает _relevant
+        return [{
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": POSITIONS_CONTRACT,
+            "topics": [None, None, None, Web3.to_hex(self.position_word)],
+        }, {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": CORE_CONTRACT,
+            "topics": [self.core_topics],
+        }]
+
+    def _get_logs(self, log_filter, attempts: int = 3):
+        for attempt in range(attempts):
+            try:
+                return self.w3.eth.get_logs(log_filter)
+            except Exception as e:
+                text = str(e).lower()
+                if any(fragment in text for fragment in TOO_LARGE_ERRORS):
+                    raise RangeTooLarge(str(e))
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def fetch_range(self, from_block: int, to_block: int):
+        """Логи диапазона. Если провайдер отказывает из-за размера - диапазон делится пополам"""
+        try:
+            logs = []
+            for log_filter in self._log_filters(from_block, to_block):
+                logs.extend(self._get_logs(log_filter))
+            return logs, False
+        except RangeTooLarge:
+            if from_block >= to_block:
+                raise
+            mid = (from_block + to_block) // 2
+            left, _ = self.fetch_range(from_block, mid)
+            right, _ = self.fetch_range(mid + 1, to_block)
+            return left + right, True
+
+    def _relevant(self, log) -> bool:
+        if Web3.to_checksum_address(log["address"]) == POSITIONS_CONTRACT:
+            return True
+        # В Core пишутся все пулы - оставляем только логи, где фигурирует наш POSITION_ID
+        return self.position_word in bytes(log["data"]) or any(bytes(t) == self.position_word for t in log["topics"])
+
+    def _decode(self, log):
+        topic0 = Web3.to_hex(log["topics"][0]) if log["topics"] else None
+        decoder = self.decoders.get(topic0)
+        if decoder is None:
+            return topic0, None, None
+        try:
+            decoded = decoder.process_log(log)
+        except Exception:
+            return topic0, None, None
+        return topic0, decoded["event"], json.dumps(_jsonable(dict(decoded["args"])))
+
+    def _store(self, logs):
+        rows = []
+        for log in logs:
+            if not self._relevant(log):
+                continue
+            topic0, event, args = self._decode(log)
+            rows.append((
+                log["blockNumber"],
+                log["logIndex"],
+                Web3.to_hex(log["transactionHash"]),
+                Web3.to_checksum_address(log["address"]),
+                event,
+                topic0,
+                json.dumps([Web3.to_hex(t) for t in log["topics"]]),
+                Web3.to_hex(log["data"]),
+                args,
+            ))
+        self.db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # ---------- Синхронизация ----------
+
+    def get_checkpoint(self):
+        row = self.db.execute("SELECT last_block FROM checkpoint WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def _set_checkpoint(self, block: int):
+        self.db.execute("INSERT OR REPLACE INTO checkpoint (id, last_block) VALUES (1, ?)", (block,))
+
+    def find_deployment_block(self, address) -> int:
+        """Бинарный поиск блока деплоя по eth_getCode (нужен архивный узел)"""
+        lo, hi = 0, self.w3.eth.block_number
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if len(self.w3.eth.get_code(address, block_identifier=mid)) > 0:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def sync(self, start_block: int = None) -> int:
+        """Догнать голову цепи (минус confirmations). Возвращает число новых событий"""
+        last = self.get_checkpoint()
+        if last is not None:
+            from_block = last + 1
+        elif start_block is not None:
+            from_block = start_block
+        elif os.getenv("EKUBO_INDEX_START_BLOCK"):
+            from_block = int(os.getenv("EKUBO_INDEX_START_BLOCK"))
+        else:
+            from_block = self.find_deployment_block(POSITIONS_CONTRACT)
+
+        head = self.w3.eth.block_number - self.confirmations
+        stored = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while from_block <= head:
+                # Волна из workers соседних чанков параллельно; чекпоинт двигается только за целую волну
+                ranges = []
+                start = from_block
+                for _ in range(self.workers):
+                    if start > head:
+                        break
+                    end = min(start + self.chunk - 1, head)
+                    ranges.append((start, end))
+                    start = end + 1
+
+                results = list(pool.map(lambda r: self.fetch_range(*r), ranges))
+                split = any(was_split for _, was_split in results)
+
+                with self.db:
+                    for logs, _ in results:
+                        stored += self._store(logs)
+                    self._set_checkpoint(ranges[-1][1])
+
+                # Адаптация размера чанка: провайдер отказал - уменьшаем, иначе растем
+                if split:
+                    self.chunk = max(self.min_chunk, self.chunk // 2)
+                else:
+                    self.chunk = min(self.max_chunk, self.chunk * 2)
+
+                from_block = ranges[-1][1] + 1
+                print(f"   {from_block - 1}/{head}, событий: {stored}, чанк: {self.chunk}")
+
+        return stored
+
+    def follow(self, interval: float = 12.0):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"⚠️  Ошибка синхронизации: {e}")
+            time.sleep(interval)
+
+    # ---------- Запросы ----------
+
+    def position_at(self, block: int) -> dict:
+        """
+        Состояние позиции на блоке по локальной таблице.
+        deposited0/1 - чистый внесенный объем в сырых единицах (выводы его уменьшают), fees0/1 - собранные комиссии
+        """
+        rows = self.db.execute(
+            "SELECT event, args FROM events WHERE block_number <= ? ORDER BY block_number, log_index",
+            (block,)
+        ).fetchall()
+
+        state = {
+            "block": block, "owner": None, "liquidity": 0, "deposited0": 0, "deposited1": 0,
+            "fees0": 0, "fees1": 0, "events": {}, "undecoded": 0,
+        }
+        for event, args in rows:
+            if event is None:
+                state["undecoded"] += 1
+                continue
+
+            state["events"][event] = state["events"].get(event, 0) + 1
+            args = json.loads(args)
+
+            if event == "Transfer":
+                state["owner"] = args["to"]
+
+            liquidity_delta = _find_arg(args, "liquidityDelta")
+            if liquidity_delta is not None:
+                state["liquidity"] += int(liquidity_delta)
+
+            if event == "PositionUpdated":
+                # Дельты со стороны пула: депозит положительный, вывод отрицательный
+                state["deposited0"] += int(args["delta0"])
+                state["deposited1"] += int(args["delta1"])
+
+            if event == "PositionFeesCollected":
+                state["fees0"] += int(_find_arg(args, "amount0") or 0)
+                state["fees1"] += int(_find_arg(args, "amount1") or 0)
+
+        return state
+
+
+if __name__ == "__main__":
+    indexer = EkuboIndexer()
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "sync":
+        print(f"✅ Новых событий: {indexer.sync()}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "follow":
+        indexer.follow(float(sys.argv[2]) if len(sys.argv) > 2 else 12.0)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "at":
+        print(json.dumps(indexer.position_at(int(sys.argv[2])), indent=2))
+    else:
+        print(__doc__)
@@ -0,0 +1,65 @@
+"""
+IPC между процессом хеджера (hedge_engine.py) и фронтендами (telegram_bot.py)
+
+Unix socket, JSON по строке на сообщение:
+  команда -> {"cmd": "set_delta", "value": 1.0}
+  ответ   <- {"ok": true, ...} или {"ok": false, "error": "..."}
+  {"cmd": "subscribe"} переводит соединение в поток событий {"type": "tick", "chat_id": ..., "text": ...}
+"""
+
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SOCKET_PATH = os.getenv("ENGINE_SOCKET", "/tmp/hedge_engine.sock")
+
+# Большой отчет (например, профиль) может не влезть в стандартный лимит строки asyncio
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+def encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode()
+
+
+def decode(line: bytes) -> dict:
+    return json.loads(line.decode())
+
+
+class EngineClient:
+    """Клиент движка: отдельное соединение на каждую команду и одно долгое на события"""
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+
+    async def request(self, cmd: str, **params) -> dict:
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return {"ok": False, "error": "движок не запущен"}
+
+        try:
+            writer.write(encode({"cmd": cmd, **params}))
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                return {"ok": False, "error": "движок закрыл соединение"}
+            return decode(line)
+        finally:
+            writer.close()
+
+    async def events(self):
+        """Поток событий движка. Разрыв соединения завершает генератор"""
+        reader, writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+        try:
+            writer.write(encode({"cmd": "subscribe"}))
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                yield decode(line)
+        finally:
+            writer.close()
@@ -0,0 +1,516 @@
+"""
+Процесс хеджера: цикл мониторинга + IPC сервер для команд и событий
+
+Запуск: python hedge_engine.py (telegram_bot.py подключается к нему отдельным процессом)
+"""
+
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from hyperliquid_client import HyperliquidClient
+from engine_ipc import SOCKET_PATH, STREAM_LIMIT, encode, decode
+from profiler import TickProfiler
+from risk import risk_grid, format_risk_table
+
+# Подписчик, который не успевает читать события, отключается - цикл его не ждет
+MAX_SUBSCRIBER_BUFFER = 1024 * 1024
+# Как часто между тиками гасить ордера в полете
+SETTLE_INTERVAL = 2.0
+
+CHECKPOINT_PATH = os.getenv("ENGINE_CHECKPOINT", "engine_checkpoint.json")
+CHECKPOINT_NUMBERS = ("time", "deviation", "timeout", "delta")
+CHECKPOINT_ORDER_FIELDS = ("cloid", "is_buy", "sz", "filled", "status", "sent_at")
+
+
+def _checkpoint_error(checkpoint):
+    """Причина, по которой чекпоинт нельзя применить, или None"""
+    if not isinstance(checkpoint, dict):
+        return "ожидается JSON объект"
+    for key in CHECKPOINT_NUMBERS:
+        value = checkpoint.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"нет числового поля {key}"
+    if not isinstance(checkpoint.get("last_decision") or {}, dict):
+        return "поле last_decision повреждено"
+    orders = checkpoint.get("pending_orders", [])
+    if not isinstance(orders, list):
+        return "поле pending_orders повреждено"
+    for order in orders:
+        if not isinstance(order, dict) or any(field not in order for field in CHECKPOINT_ORDER_FIELDS):
+            return "поле pending_orders повреждено"
+    return None
+
+
+class HedgeEngine:
+
+    def __init__(self, socket_path: str = SOCKET_PATH, checkpoint_path: str = CHECKPOINT_PATH):
+        self.socket_path = socket_path
+        self.checkpoint_path = checkpoint_path
+        self.client = None
+        self.chat_id = None
+        self.monitoring_task = None
+        # Желаемое состояние мониторинга - переживает перезапуск, в отличие от самой задачи
+        self.monitoring_wanted = False
+        self.last_decision = None
+        self._restore_notice = None
+        self._checkpoint_lock = threading.Lock()
+        self.subscribers = set()
+        self.profiler = TickProfiler()
+        # Последнее известное состояние рынка и позиций - общее для тика, /status и /risk
+        self.snapshot = None
+
+        self._wake = asyncio.Event()
+        self._shutdown = asyncio.Event()
+        self._stopping = False
+        self._client_lock = asyncio.Lock()
+
+    async def get_client(self) -> HyperliquidClient:
+        async with self._client_lock:
+            if self.client is None:
+                self.client = await asyncio.to_thread(HyperliquidClient)
+                self.client.tracker.on_change = self.save_checkpoint
+            return self.client
+
+    def is_monitoring(self) -> bool:
+        return self.monitoring_task is not None and not self.monitoring_task.done()
+
+    # ---------- Команды ----------
+
+    async def cmd_set_deviation(self, value):
+        (await self.get_client()).set_deviation(float(value))
+        self.save_checkpoint()
+        return {}
+
+    async def cmd_set_timeout(self, value):
+        (await self.get_client()).set_timeout(int(value))
+        self.save_checkpoint()
+        return {}
+
+    async def cmd_set_delta(self, value):
+        (await self.get_client()).set_delta(float(value))
+        self.save_checkpoint()
+        return {}
+
+    async def cmd_start_monitoring(self, chat_id=None):
+        if self.is_monitoring():
+            return {"already_running": True}
+
+        client = await self.get_client()
+        client.start_control_loop()
+        self.chat_id = chat_id
+        self.monitoring_wanted = True
+        self.save_checkpoint()
+        # Стоп посреди тика оставляет _wake взведенным - иначе второй тик пойдет без паузы
+        self._wake.clear()
+        self.monitoring_task = asyncio.create_task(self.run_monitoring_loop())
+        return {"already_running": False}
+
+    async def cmd_stop_monitoring(self):
+        if not self.is_monitoring():
+            return {"was_running": False}
+
+        self.client.stop_control_loop()
+        self.monitoring_wanted = False
+        self.save_checkpoint()
+        self._wake.set()
+        # Дожидаемся конца текущего тика - ордер в полете не обрывается
+        await self.monitoring_task
+        self.monitoring_task = None
+        return {"was_running": True}
+
+    async def cmd_profile(self, n_ticks):
+        self.profiler.start_cpu(int(n_ticks))
+        return {"monitoring": self.is_monitoring()}
+
+    async def cmd_memprofile(self, n_ticks=1):
+        self.profiler.start_mem(int(n_ticks))
+        return {"monitoring": self.is_monitoring()}
+
+    async def cmd_risk(self):
+        if self.snapshot is None:
+            return {"text": None}
+
+        snap = self.snapshot
+        grid = risk_grid(
+            snap["eth_price"],
+            snap["ekubo_eth"],
+            snap["ekubo_usdc"],
+            snap["short"],
+            self.client.get_delta(),
+            snap["funding_rate"]
+        )
+        return {"text": format_risk_table(grid), "age": time.time() - snap["time"]}
+
+    async def cmd_status(self):
+        if self.client is None:
+            return {"initialized": False}
+
+        status = await asyncio.to_thread(self._collect_status)
+        status["initialized"] = True
+        status["monitoring"] = self.is_monitoring()
+        return status
+
+    def _collect_status(self):
+        client = self.client
+        ekubo_success, ekubo_data = client.get_ekubo_positions()
+        fees_success, fees_data = client.get_ekubo_fees()
+
+        try:
+            hl_position = client.get_hl_positions()
+        except Exception:
+            hl_position = None
+
+        eth_price = client.get_eth_price()
+        self._update_snapshot(eth_price, ekubo_success, ekubo_data, hl_position)
+
+        return {
+            "deviation": client.get_deviation(),
+            "timeout": client.get_timeout(),
+            "delta": client.get_delta(),
+            "eth_price": eth_price,
+            "ekubo": [ekubo_success, ekubo_data],
+            "fees": [fees_success, fees_data],
+            "hl_position": hl_position,
+        }
+
+    def _update_snapshot(self, eth_price, ekubo_success, ekubo_data, hl_position):
+        if not ekubo_success or eth_price <= 0:
+            return
+        try:
+            funding_rate = self.client.get_funding_rate()
+        except Exception:
+            funding_rate = self.snapshot["funding_rate"] if self.snapshot else 0.0
+
+        self.snapshot = {
+            "time": time.time(),
+            "eth_price": eth_price,
+            "ekubo_eth": ekubo_data[0],
+            "ekubo_usdc": ekubo_data[1],
+            # Знак сохраняется: лонг на HL - отрицательный шорт, а не хедж
+            "short": -float(hl_position['szi']) if hl_position else 0.0,
+            "funding_rate": funding_rate,
+        }
+
+    # ---------- Цикл мониторинга ----------
+
+    async def run_monitoring_loop(self):
+        client = self.client
+        try:
+            while client.control_loop_flag and not self._stopping:
+                # Тик целиком в отдельном потоке: сеть и подпись не блокируют IPC
+                message, reports = await asyncio.to_thread(self.profiler.run, self._tick)
+                self.save_checkpoint()
+
+                if self._restore_notice:
+                    self.publish({"type": "tick", "chat_id": self.chat_id, "text": self._restore_notice})
+                    self._restore_notice = None
+                self.publish({"type": "tick", "chat_id": self.chat_id, "text": message})
+                for filename, report in reports:
+                    self.publish({"type": "profile", "chat_id": self.chat_id, "filename": filename, "text": report})
+
+                await self._wait_next_tick(client.get_timeout())
+        finally:
+            # tracemalloc не остается включенным после остановки цикла
+            self.profiler.stop()
+
+    async def _wait_next_tick(self, timeout: float):
+        """Пауза до следующего тика; пока ждем - гасим ордера в полете, не блокируя решение"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self._wake.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=min(SETTLE_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+            if self.client.tracker.orders:
+                try:
+                    await asyncio.to_thread(self.client.settle_orders)
+                except Exception as e:
+                    print(f"⚠️  Не удалось проверить ордера: {e}")
+        self._wake.clear()
+
+    def _tick(self) -> str:
+        client = self.client
+        try:
+            success, action = client.check_to_change_position()
+            self.last_decision = {"time": time.time(), "action": action, "success": success}
+
+            current_time = datetime.now().strftime("%H:%M:%S %d.%m.%Y")
+            message = f"⏰ {current_time}\n"
+
+            if success:
+                message += f"🔄 Действие: {action}\n"
+
+                result_success, result = False, None
+                if action == "place_min_short":
+                    result_success, result = client.place_min_short()
+                    message += f"   Выставлен минимальный шорт: {'✅' if result_success else '❌'}\n"
+                elif action == "place_max_short":
+                    result_success, result = client.place_max_short()
+                    message += f"   Выставлен максимальный шорт: {'✅' if result_success else '❌'}\n"
+                elif action == "decrease":
+                    result_success, result = client.decrease_short()
+                    message += f"   Уменьшен шорт: {'✅' if result_success else '❌'}\n"
+                elif action == "increase":
+                    result_success, result = client.increase_short()
+                    message += f"   Увеличен шорт: {'✅' if result_success else '❌'}\n"
+
+                self.last_decision["result"] = result_success
+
+                timing = client.last_order_timing
+                if timing:
+                    message += (f"   Отправка: сборка {timing['build_us']:.0f} мкс, подпись {timing['sign_us']:.0f} мкс, "
+                                f"POST {timing['post_ms']:.1f} мс\n")
+
+                if result_success and isinstance(result, dict):
+                    filled = result.get('response', {}).get('data', {}).get('statuses', [{}])[0].get('filled')
+                    if filled:
+                        message += f"   Исполнено: {filled.get('totalSz')} ETH @ ${filled.get('avgPx')}"
+            else:
+                message += f"✅ {action}"
+
+            hl_eth = 0
+            hl_pos = client.get_hl_positions()
+            if hl_pos:
+                hl_eth = round(float(hl_pos['szi']), 5)
+
+            ekubo_eth = 0
+            ekubo_usdc = 0
+            success_pool, ekubo_pos = client.get_ekubo_positions()
+            if success_pool:
+                ekubo_eth = round(ekubo_pos[0], 5)
+                ekubo_usdc = round(ekubo_pos[1], 2)
+
+            eth_fees = 0
+            usdc_fees = 0
+            success, ekubo_fees = client.get_ekubo_fees()
+            if success:
+                eth_fees = round(ekubo_fees[0], 5)
+                usdc_fees = round(ekubo_fees[1], 2)
+
+            self._update_snapshot(client.book.mid_price(), success_pool, ekubo_pos, hl_pos)
+
+            message += "=====================\n"
+            message += f"HL short: {hl_eth} ETH\n"
+            message += f"Ekubo pool: {ekubo_eth} ETH | {ekubo_usdc} USDC\n"
+            message += f"Ekubo fees: {eth_fees} ETH | {usdc_fees} USDC\n"
+            message += "=====================\n"
+            return message
+
+        except Exception as e:
+            return f"❌ Ошибка в цикле: {e}"
+
+    # ---------- Чекпоинт ----------
+
+    def save_checkpoint(self):
+        """Атомарная запись состояния: tmp файл + os.replace, после падения файл всегда целый"""
+        if self.client is None:
+            return
+
+        state = {
+            "time": time.time(),
+            "deviation": self.client.get_deviation(),
+            "timeout": self.client.get_timeout(),
+            "delta": self.client.get_delta(),
+            "monitoring": self.monitoring_wanted,
+            "chat_id": self.chat_id,
+            "last_decision": self.last_decision,
+            "pending_orders": self.client.tracker.pending(),
+        }
+
+        tmp_path = self.checkpoint_path + ".tmp"
+        with self._checkpoint_lock:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def load_checkpoint(self):
+        """Чекпоинт или None. Нечитаемый или неполный файл пропускается - движок стартует без восстановления"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Чекпоинт не прочитан: {e}")
+            return None
+
+        error = _checkpoint_error(checkpoint)
+        if error is not None:
+            print(f"⚠️  Чекпоинт пропущен: {error}")
+            return None
+        return checkpoint
+
+    async def restore(self):
+        """Применить чекпоинт, сверить ордера с биржей и продолжить мониторинг, если он был включен"""
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None:
+            return
+
+        client = self.client
+        client.set_deviation(checkpoint["deviation"])
+        client.set_timeout(checkpoint["timeout"])
+        client.set_delta(checkpoint["delta"])
+        self.chat_id = checkpoint.get("chat_id")
+        self.last_decision = checkpoint.get("last_decision")
+        client.tracker.restore(checkpoint.get("pending_orders", []))
+
+        try:
+            self._restore_notice = await asyncio.to_thread(self._reconcile, checkpoint)
+        except Exception as e:
+            # Ордера из чекпоинта все равно догасит settle_orders в цикле
+            self._restore_notice = f"♻️ Движок перезапущен, сверка с биржей не удалась: {e}"
+        print(self._restore_notice)
+
+        if checkpoint.get("monitoring"):
+            await self.cmd_start_monitoring(self.chat_id)
+
+    def _reconcile(self, checkpoint) -> str:
+        client = self.client
+        restored = len(client.tracker.orders)
+
+        # Исход ордеров из чекпоинта + свежий размер позиции
+        client.settle_orders()
+        client.update_cur_eth_size()
+        unresolved = [o for o in client.tracker.pending() if o["status"] in ("sent", "open")]
+
+        since_ms = int(checkpoint["time"] * 1000)
+        fills = client.get_fills_since(since_ms)
+        open_orders = client.get_open_orders()
+
+        lines = [
+            "♻️ Движок перезапущен, состояние восстановлено",
+            f"   Параметры: deviation {client.get_deviation()}, timeout {client.get_timeout()}, delta {client.get_delta()}",
+            f"   Последнее решение: {(checkpoint.get('last_decision') or {}).get('action', '-')}",
+            f"   Ордеров в полете: {restored}, без исхода: {len(unresolved)}",
+            f"   Исполнений после чекпоинта: {len(fills)}",
+        ]
+        for fill in fills:
+            lines.append(f"     {fill['side']} {fill['sz']} ETH @ ${fill['px']}")
+        if open_orders:
+            # Бот ставит только IOC - висящий ордер значит, что что-то пошло не так
+            lines.append(f"   ⚠️ Открытых ордеров ETH на бирже: {len(open_orders)}")
+        lines.append(f"   HL short: {client.cur_eth_size} ETH")
+        lines.append(f"   Мониторинг: {'🟢 продолжается' if checkpoint.get('monitoring') else '🔴 был остановлен'}")
+        return "\n".join(lines)
+
+    # ---------- IPC ----------
+
+    def publish(self, event: dict):
+        data = encode(event)
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = decode(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    writer.write(encode({"ok": False, "error": "запрос должен быть JSON объектом"}))
+                    await writer.drain()
+                    continue
+
+                cmd = request.pop("cmd", None)
+
+                if cmd == "subscribe":
+                    self.subscribers.add(writer)
+                    continue
+
+                handler = getattr(self, f"cmd_{cmd}", None)
+                if handler is None:
+                    reply = {"ok": False, "error": f"неизвестная команда {cmd}"}
+                else:
+                    try:
+                        reply = {"ok": True, **(await handler(**request))}
+                    except Exception as e:
+                        reply = {"ok": False, "error": str(e)}
+
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    # ---------- Жизненный цикл ----------
+
+    def request_stop(self):
+        print("\n🛑 Получен сигнал завершения, дожидаемся конца текущего тика...")
+        self._stopping = True
+        if self.client:
+            self.client.stop_control_loop()
+        self._wake.set()
+        self._shutdown.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, self.request_stop)
+        loop.add_signal_handler(signal.SIGTERM, self.request_stop)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_connection, self.socket_path, limit=STREAM_LIMIT)
+        os.chmod(self.socket_path, 0o600)
+        print(f"✅ Движок запущен, сокет: {self.socket_path}")
+
+        try:
+            # Клиент нужен для восстановления - пробуем, пока не получится
+            print("⏳ Инициализация Hyperliquid клиента...")
+            while not self._stopping:
+                try:
+                    await self.get_client()
+                    print("✅ Клиент инициализирован")
+                    break
+                except Exception as e:
+                    print(f"⚠️  Не удалось инициализировать клиент: {e}, повтор через 5 сек")
+                    try:
+                        await asyncio.wait_for(self._shutdown.wait(), timeout=5)
+                    except asyncio.TimeoutError:
+                        pass
+
+            # Сбой восстановления не повод переподнимать клиент - движок работает без него
+            if self.client is not None and not self._stopping:
+                try:
+                    await self.restore()
+                except Exception as e:
+                    print(f"⚠️  Не удалось восстановить состояние: {e}")
+
+            await self._shutdown.wait()
+            if self.monitoring_task is not None:
+                await self.monitoring_task
+            self.save_checkpoint()
+        finally:
+            server.close()
+            for writer in list(self.subscribers):
+                writer.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.client and hasattr(self.client.submitter, "stop"):
+                self.client.submitter.stop()
+            print("✅ Движок остановлен")
+
+
+if __name__ == "__main__":
+    asyncio.run(HedgeEngine().run())
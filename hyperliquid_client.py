@@ -4,33 +4,49 @@ Hyperliquid API Client для управления позициями
 
 import time
 import json
-import math
 import os
 from ekubo_config import *
 from hyperliquid.info import Info
-from hyperliquid.exchange import Exchange
 from hyperliquid.utils import constants
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 from web3 import Web3
 from dotenv import load_dotenv
+from paper_exchange import PaperExchange, PaperInfo, LiveBookSource, RecordedBookSource
+from orderbook import L2BookCache
+from order_submitter import OrderSubmitter
+from order_tracker import OrderTracker
 
 load_dotenv()
 
+# Минимальный ордер Hyperliquid. Запас покрывает округление размера до szDecimals в OrderSubmitter
+MIN_ORDER_USD = 10
+MIN_ORDER_MARGIN = 1.05
+
 
 class HyperliquidClient:
     
     def __init__(self):
         self.main_address = os.getenv("MAIN_ADDRESS")
         self.base_url = constants.MAINNET_API_URL
-        self.private_key = os.getenv("SUB_PRIVATE_KEY")
-        self.account: LocalAccount = Account.from_key(self.private_key)
-        self.exchange = Exchange(
-            self.account,
-            self.base_url,
-            account_address=self.main_address
-        )
-        self.info = Info(self.base_url, skip_ws=True)
+
+        # PAPER_TRADING=1 - ордера исполняются локальным матчером, а не на бирже
+        self.paper = os.getenv("PAPER_TRADING", "0") == "1"
+        if self.paper:
+            self.main_address = self.main_address or "0x0000000000000000000000000000000000000000"
+            self.account = None
+            self.exchange = self._init_paper_exchange()
+            self.info = PaperInfo(self.exchange)
+            self.submitter = self.exchange
+        else:
+            self.private_key = os.getenv("SUB_PRIVATE_KEY")
+            self.account: LocalAccount = Account.from_key(self.private_key)
+            # Ордера идут через OrderSubmitter - Exchange из SDK в live-режиме не нужен
+            self.exchange = None
+            self.info = Info(self.base_url, skip_ws=True)
+            # Горячий путь отправки ордеров: метаданные и соединение готовы заранее
+            self.submitter = OrderSubmitter(self.account, self.base_url)
+            self.submitter.start()
 
         self.deviation = 0.004
         self.timeout = 15
@@ -38,12 +54,37 @@ class HyperliquidClient:
 
         self.control_loop_flag = True
 
+        # Ордера в полете (по cloid): учитываются в размере шорта до подтверждения биржей
+        self.tracker = OrderTracker()
+        # Тайминг отправки ордера в текущем тике (сборка/подпись/POST), в paper-режиме нет
+        self.last_order_timing = None
+
+        # Фандинг меняется медленно - не запрашиваем его каждый тик
+        self._funding_rate = 0.0
+        self._funding_updated_at = 0.0
+
+        # Стакан ETH: в paper-режиме он локальный, поэтому кэш не нужен
+        self.book = L2BookCache(self.info, "ETH", ttl=0 if self.paper else 1.0, max_slippage=0.005)
+
         hl_position = self.get_hl_positions()
         if hl_position:
             self.cur_eth_size = abs(float(hl_position['szi']))
         else:
             self.cur_eth_size = 0.0
 
+    def _init_paper_exchange(self) -> PaperExchange:
+        book_file = os.getenv("PAPER_BOOK_FILE")
+        if book_file:
+            book = RecordedBookSource(book_file)
+        else:
+            book = LiveBookSource(Info(self.base_url, skip_ws=True))
+
+        return PaperExchange(
+            book,
+            slippage_bps=float(os.getenv("PAPER_SLIPPAGE_BPS", "0")),
+            balance=float(os.getenv("PAPER_BALANCE", "10000"))
+        )
+
 
     def set_deviation(self, deviation: float):
         self.deviation = deviation
@@ -70,16 +111,102 @@ class HyperliquidClient:
         else:
             self.cur_eth_size = 0.0
 
+    def effective_eth_size(self) -> float:
+        """Текущий шорт с учетом еще не подтвержденных ордеров"""
+        return self.cur_eth_size + self.tracker.pending_short_delta()
+
+    def settle_orders(self) -> bool:
+        """Закрыть завершенные ордера и один раз обновить позицию. True, если что-то погашено"""
+        if not self.tracker.orders:
+            return False
+
+        user = Web3.to_checksum_address(self.main_address)
+        finished = self.tracker.resolve(self.info, user)
+        if not finished:
+            return False
+
+        # Позиция читается после того, как ордера завершились, - их исполнения в ней уже есть
+        self.update_cur_eth_size()
+        self.tracker.drop(finished)
+        return True
+
+    def submit_order(self, is_buy: bool, size_eth: float, limit_price: float, reduce_only: bool):
+        cloid = self.tracker.new_cloid()
+        self.tracker.register(cloid, is_buy, size_eth, reduce_only)
+        user = Web3.to_checksum_address(self.main_address)
+
+        order_result = None
+        error = None
+        for attempt in range(2):
+            try:
+                order_result = self.submitter.order(
+                    name="ETH",
+                    is_buy=is_buy,
+                    sz=size_eth,
+                    limit_px=limit_price,
+                    order_type={"limit": {"tif": "Ioc"}},
+                    reduce_only=reduce_only,
+                    cloid=cloid
+                )
+                self.last_order_timing = getattr(self.submitter, "last_timing", None)
+                break
+            except Exception as e:
+                error = str(e)
+                # Ответ потерян: повторяем с тем же cloid, только если биржа этот ордер не видела
+                try:
+                    if self.tracker.is_known(self.info, user, cloid):
+                        return False, error
+                except Exception:
+                    return False, error
+
+        # Без ответа ордер остается "sent" - его исход выяснит settle_orders
+        if order_result is None:
+            return False, error
+
+        self.tracker.apply_response(cloid, order_result)
+
+        if isinstance(order_result, dict) and order_result.get("status") == "ok":
+            return True, order_result
+        else:
+            return False, order_result
+
     def get_eth_price(self) -> float:
         all_mids = self.info.all_mids()
         eth_price = float(all_mids.get("ETH", 0))
         return eth_price
 
+    def get_funding_rate(self) -> float:
+        """Часовая ставка фандинга ETH, кэш на 5 минут. В paper-режиме фандинга нет"""
+        if self.paper:
+            return 0.0
+
+        if time.time() - self._funding_updated_at > 300:
+            meta, asset_ctxs = self.info.meta_and_asset_ctxs()
+            for asset, ctx in zip(meta["universe"], asset_ctxs):
+                if asset["name"] == "ETH":
+                    self._funding_rate = float(ctx["funding"])
+                    break
+            self._funding_updated_at = time.time()
+        return self._funding_rate
+
+    def plan_order(self, is_buy: bool, size_eth: float):
+        """
+        Размер и лимитная цена ордера по текущему стакану с учетом минимального ордера в $10.
+        Значения не округляются - шаг цены и размера по szDecimals применяет OrderSubmitter
+        """
+        limit_price, planned_size, _ = self.book.plan_order(is_buy, size_eth)
+
+        if limit_price <= 0:
+            # Стакан недоступен - старое поведение: mid ± 1%
+            eth_price = self.get_eth_price()
+            limit_price = eth_price * 1.01 if is_buy else eth_price * 0.99
+            planned_size = size_eth
+
+        min_size = MIN_ORDER_USD * MIN_ORDER_MARGIN / limit_price
+        return max(min_size, planned_size), limit_price
+
     def increase_short(self):
         success, data = self.get_ekubo_positions()
-        eth_price = self.get_eth_price()
-
-        limit_price = round(eth_price * 0.99, 1)
         
         ekubo_eth_size = 0
         if success:
@@ -87,38 +214,14 @@ class HyperliquidClient:
         
         # Целевой шорт с учетом delta
         target_short = ekubo_eth_size * self.delta
-        increase_coef = abs(target_short - self.cur_eth_size) // self.deviation
+        increase_coef = abs(target_short - self.effective_eth_size()) // self.deviation
 
-        size_eth = max(
-            math.ceil((10 / eth_price) * 1000) / 1000,
-            round(self.deviation * increase_coef, 3)
-        )
+        size_eth, limit_price = self.plan_order(False, self.deviation * increase_coef)
 
-        try:
-            order_result = self.exchange.order(
-                name="ETH",
-                is_buy=False,
-                sz=size_eth,
-                limit_px=limit_price,
-                order_type={"limit": {"tif": "Ioc"}},
-                reduce_only=False
-            )
-
-            self.update_cur_eth_size()
-            
-            if order_result.get("status") == "ok":
-                return True, order_result
-            else:
-                return False, order_result
-        except Exception as e:
-            self.update_cur_eth_size()
-            return False, str(e)
+        return self.submit_order(is_buy=False, size_eth=size_eth, limit_price=limit_price, reduce_only=False)
 
     def decrease_short(self):
         success, data = self.get_ekubo_positions()
-        eth_price = self.get_eth_price()
-
-        limit_price = round(eth_price * 1.01, 1)
 
         ekubo_eth_size = 0
         if success:
@@ -126,98 +229,43 @@ class HyperliquidClient:
         
         # Целевой шорт с учетом delta
         target_short = ekubo_eth_size * self.delta
-        decrease_coef = abs(target_short - self.cur_eth_size) // self.deviation
+        decrease_coef = abs(target_short - self.effective_eth_size()) // self.deviation
         
-        size_eth = max(
-            math.ceil((10 / eth_price) * 1000) / 1000,
-            round(self.deviation * decrease_coef, 3)
-        )
+        size_eth, limit_price = self.plan_order(True, self.deviation * decrease_coef)
         
-        try:
-            order_result = self.exchange.order(
-                name="ETH",
-                is_buy=True,
-                sz=size_eth,
-                limit_px=limit_price,
-                order_type={"limit": {"tif": "Ioc"}},
-                reduce_only=True
-            )
-
-            self.update_cur_eth_size()
-
-            if order_result.get("status") == "ok":
-                return True, order_result
-            else:
-                return False, order_result
-        except Exception as e:
-            self.update_cur_eth_size()
-            return False, str(e)
+        return self.submit_order(is_buy=True, size_eth=size_eth, limit_price=limit_price, reduce_only=True)
 
     def place_min_short(self):
-        position = self.get_hl_positions()
-        eth_price = self.get_eth_price()
-
-        if position:
-            current_size = float(position['szi'])
-            size_eth = max(math.ceil((10 / eth_price) * 1000) / 1000, round(abs(current_size) - 0.001, 3))
+        # Пока прошлый ордер в полете, позиция неизвестна - иначе закроем шорт дважды
+        if self.tracker.has_unresolved():
+            return False, "Есть неподтвержденные ордера"
 
-            limit_price = round(eth_price * 1.01, 1)
-
-            try:
-                order_result = self.exchange.order(
-                    name="ETH",
-                    is_buy=True,
-                    sz=size_eth,
-                    limit_px=limit_price,
-                    order_type={"limit": {"tif": "Ioc"}},
-                    reduce_only=True
-                )
+        size = round(self.effective_eth_size() - 0.001, 3)
+        if size <= 0:
+            return False, "Шорт уже минимальный"
 
-                self.update_cur_eth_size()
+        size_eth, limit_price = self.plan_order(True, size)
 
-                if order_result.get("status") == "ok":
-                    return True, order_result
-                else:
-                    return False, order_result
-            except Exception as e:
-                self.update_cur_eth_size()
-                return False, str(e)
+        return self.submit_order(is_buy=True, size_eth=size_eth, limit_price=limit_price, reduce_only=True)
 
     def place_max_short(self):
-        position = self.get_hl_positions()
-        eth_price = self.get_eth_price()
+        if self.tracker.has_unresolved():
+            return False, "Есть неподтвержденные ордера"
+
         ekubo_eth_size = 0
         success, data = self.get_ekubo_positions()
         if success:
             ekubo_eth_size = data[0]
 
-        if position:
-            current_size = float(position['szi'])
-            # Целевой шорт с учетом delta
-            target_short = ekubo_eth_size * self.delta
-            size_eth = max(math.ceil((10 / eth_price) * 1000) / 1000, round(target_short - current_size, 3))
-
-            limit_price = round(eth_price * 0.99, 1)
-
-            try:
-                order_result = self.exchange.order(
-                    name="ETH",
-                    is_buy=False,
-                    sz=size_eth,
-                    limit_px=limit_price,
-                    order_type={"limit": {"tif": "Ioc"}},
-                    reduce_only=False
-                )
+        # Целевой шорт с учетом delta
+        target_short = ekubo_eth_size * self.delta
+        size = round(target_short - self.effective_eth_size(), 3)
+        if size <= 0:
+            return False, "Шорт уже максимальный"
 
-                self.update_cur_eth_size()
+        size_eth, limit_price = self.plan_order(False, size)
 
-                if order_result.get("status") == "ok":
-                    return True, order_result
-                else:
-                    return False, order_result
-            except Exception as e:
-                self.update_cur_eth_size()
-                return False, str(e)
+        return self.submit_order(is_buy=False, size_eth=size_eth, limit_price=limit_price, reduce_only=False)
 
     def get_hl_positions(self):
         checksum_address = Web3.to_checksum_address(self.main_address)
@@ -229,7 +277,24 @@ class HyperliquidClient:
         cur_position = positions[0]['position']
         return cur_position
 
+    def get_open_orders(self):
+        # Состояние paper-биржи не переживает перезапуск - сверять нечего
+        if self.paper:
+            return []
+        checksum_address = Web3.to_checksum_address(self.main_address)
+        return [o for o in self.info.open_orders(checksum_address) if o["coin"] == "ETH"]
+
+    def get_fills_since(self, start_ms: int):
+        if self.paper:
+            return []
+        checksum_address = Web3.to_checksum_address(self.main_address)
+        return [f for f in self.info.user_fills_by_time(checksum_address, start_ms) if f["coin"] == "ETH"]
+
     def get_ekubo_positions(self):
+        # При replay записанного стакана состояние пула берется из той же записи
+        if self.paper and self.exchange.book.ekubo is not None:
+            return True, tuple(self.exchange.book.ekubo)
+
         RPC_URL = os.getenv("ETHEREUM_RPC_URL")
         w3 = Web3(Web3.HTTPProvider(RPC_URL))
 
@@ -309,6 +374,13 @@ class HyperliquidClient:
 
 
     def check_to_change_position(self):
+        if self.paper:
+            self.exchange.advance()
+
+        self.last_order_timing = None
+        self.settle_orders()
+        cur_eth_size = self.effective_eth_size()
+
         success, data = self.get_ekubo_positions()
 
         if success:
@@ -320,8 +392,8 @@ class HyperliquidClient:
         if success:
             # Целевой шорт с учетом delta
             target_short = data[0] * self.delta
-            if abs(self.cur_eth_size - target_short) >= self.deviation:
-                if self.cur_eth_size > target_short:
+            if abs(cur_eth_size - target_short) >= self.deviation:
+                if cur_eth_size > target_short:
                     return True, "decrease"
                 else:
                     return True, "increase"
@@ -0,0 +1,142 @@
+"""
+Быстрая отправка ордеров: метаданные монет закэшированы, соединение прогрето,
+цена и размер квантуются в Decimal без промежуточных float
+"""
+
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+
+import requests
+from requests.adapters import HTTPAdapter
+from hyperliquid.utils import constants
+from hyperliquid.utils.signing import get_timestamp_ms, order_type_to_wire, order_wires_to_order_action, sign_l1_action
+
+
+def _to_decimal(x) -> Decimal:
+    # str(float) - кратчайшее представление, двоичный хвост float в Decimal не попадает
+    return x if isinstance(x, Decimal) else Decimal(str(x))
+
+
+def _to_wire(d: Decimal) -> str:
+    s = format(d.normalize(), "f")
+    return "0" if s == "-0" else s
+
+
+class OrderSubmitter:
+    """Отправитель ордеров с тем же интерфейсом order(), что и Exchange из hyperliquid-python-sdk"""
+
+    def __init__(self, wallet, base_url: str = constants.MAINNET_API_URL, vault_address=None, ping_interval: float = 30.0):
+        self.wallet = wallet
+        self.base_url = base_url
+        self.vault_address = vault_address
+        self.is_mainnet = base_url == constants.MAINNET_API_URL
+        self.ping_interval = ping_interval
+
+        # Одна keep-alive сессия: TCP/TLS поднимаются один раз и держатся пингами
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self.assets = {}  # name -> (asset index, szDecimals)
+        self.last_timing = {}
+        self._nonce = 0
+        self._nonce_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ping_thread = None
+
+    def start(self):
+        """Загрузить метаданные (заодно прогреть соединение) и запустить пинги"""
+        self.load_meta()
+        self._ping_thread = threading.Thread(target=self._ping_loop, daemon=True)
+        self._ping_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.session.close()
+
+    def load_meta(self):
+        meta = self._post("/info", {"type": "meta"})
+        self.assets = {
+            asset["name"]: (index, asset["szDecimals"])
+            for index, asset in enumerate(meta["universe"])
+        }
+
+    def quantize_size(self, name: str, sz) -> Decimal:
+        _, sz_decimals = self.assets[name]
+        return _to_decimal(sz).quantize(Decimal(1).scaleb(-sz_decimals), rounding=ROUND_HALF_UP)
+
+    def quantize_price(self, name: str, px, is_buy: bool) -> Decimal:
+        """
+        Цена перпа: не больше 5 значащих цифр и не больше (6 - szDecimals) знаков после запятой,
+        целые цены допустимы всегда. Покупка округляется вверх, продажа вниз - лимит не сужается.
+        """
+        _, sz_decimals = self.assets[name]
+        d = _to_decimal(px)
+        step = max(Decimal(1).scaleb(d.adjusted() - 4), Decimal(1).scaleb(sz_decimals - 6))
+        step = min(step, Decimal(1))
+        return d.quantize(step, rounding=ROUND_CEILING if is_buy else ROUND_FLOOR)
+
+    def build_order_action(self, name, is_buy, sz, limit_px, order_type, reduce_only=False, cloid=None):
+        asset, _ = self.assets[name]
+        # Порядок ключей как в order_request_to_order_wire - от него зависит хэш подписи
+        wire = {
+            "a": asset,
+            "b": is_buy,
+            "p": _to_wire(self.quantize_price(name, limit_px, is_buy)),
+            "s": _to_wire(self.quantize_size(name, sz)),
+            "r": reduce_only,
+            "t": order_type_to_wire(order_type),
+        }
+        if cloid is not None:
+            wire["c"] = cloid.to_raw()
+        return order_wires_to_order_action([wire])
+
+    def sign(self, action):
+        nonce = self._next_nonce()
+        signature = sign_l1_action(self.wallet, action, self.vault_address, nonce, None, self.is_mainnet)
+        return {
+            "action": action,
+            "nonce": nonce,
+            "signature": signature,
+            "vaultAddress": self.vault_address,
+            "expiresAfter": None,
+        }
+
+    def order(self, name, is_buy, sz, limit_px, order_type, reduce_only=False, cloid=None, builder=None):
+        if builder is not None:
+            # Поле builder в действии не формируется - молча отправить ордер без него нельзя
+            raise ValueError("builder fee не поддерживается OrderSubmitter")
+        t0 = time.perf_counter()
+        action = self.build_order_action(name, is_buy, sz, limit_px, order_type, reduce_only, cloid)
+        t1 = time.perf_counter()
+        payload = self.sign(action)
+        t2 = time.perf_counter()
+        result = self._post("/exchange", payload)
+        t3 = time.perf_counter()
+
+        self.last_timing = {
+            "build_us": (t1 - t0) * 1e6,
+            "sign_us": (t2 - t1) * 1e6,
+            "post_ms": (t3 - t2) * 1e3,
+        }
+        return result
+
+    def _next_nonce(self) -> int:
+        # Два ордера в одну миллисекунду не должны получить одинаковый nonce
+        with self._nonce_lock:
+            self._nonce = max(get_timestamp_ms(), self._nonce + 1)
+            return self._nonce
+
+    def _post(self, path: str, payload):
+        response = self.session.post(self.base_url + path, json=payload, timeout=10)
+        if response.status_code >= 400:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return response.json()
+
+    def _ping_loop(self):
+        while not self._stop.wait(self.ping_interval):
+            try:
+                self._post("/info", {"type": "allMids"})
+            except Exception as e:
+                print(f"⚠️  Пинг Hyperliquid не прошел: {e}")
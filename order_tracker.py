@@ -0,0 +1,126 @@
+"""
+Таблица ордеров в полете: cloid -> что отправили и что о нем известно
+"""
+
+import secrets
+import threading
+import time
+from hyperliquid.utils.types import Cloid
+
+# Статусы query_order_by_cloid, при которых ордер еще может исполниться
+LIVE_STATUSES = ("open", "triggered")
+
+
+class OrderTracker:
+    """
+    Пока ордер не погашен (settle), его объем учитывается в размере шорта:
+    исполненная часть - по факту, неизвестная - целиком, чтобы не захеджировать дважды
+    """
+
+    def __init__(self, lost_after: float = 10.0):
+        self.lost_after = lost_after  # Через сколько секунд unknownOid считается недошедшим ордером
+        self.orders = {}
+        self.on_change = None  # Вызывается после любого изменения таблицы (сохранение чекпоинта)
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def new_cloid(self) -> Cloid:
+        return Cloid.from_int(secrets.randbits(128))
+
+    def register(self, cloid: Cloid, is_buy: bool, sz: float, reduce_only: bool):
+        with self._lock:
+            self.orders[cloid.to_raw()] = {
+                "cloid": cloid.to_raw(),
+                "is_buy": is_buy,
+                "sz": sz,
+                "reduce_only": reduce_only,
+                "filled": 0.0,
+                "status": "sent",  # sent -> open/filled/canceled/rejected/lost
+                "sent_at": time.time(),
+            }
+        # Cloid попадает в чекпоинт до отправки ордера
+        self._changed()
+
+    def apply_response(self, cloid: Cloid, order_result):
+        """
+        Разобрать ответ exchange.order. IOC остаток без исполнения биржа отменяет сама.
+        На ошибку биржа отвечает {"status": "err", "response": "<текст>"} - ордер не принят
+        """
+        with self._lock:
+            order = self.orders.get(cloid.to_raw())
+            if order is None:
+                return
+
+            ok = isinstance(order_result, dict) and order_result.get("status") == "ok"
+            if not ok or not isinstance(order_result.get("response"), dict):
+                order["status"] = "rejected"
+            else:
+                statuses = order_result["response"].get("data", {}).get("statuses") or [{}]
+                status = statuses[0]
+                if "filled" in status:
+                    order["filled"] = float(status["filled"]["totalSz"])
+                    order["status"] = "filled"
+                elif "resting" in status:
+                    order["status"] = "open"
+                elif "error" in status:
+                    order["status"] = "rejected"
+        self._changed()
+
+    def pending_short_delta(self) -> float:
+        """На сколько изменится шорт, когда все ордера в полете будут учтены в позиции"""
+        delta = 0.0
+        with self._lock:
+            for order in self.orders.values():
+                if order["status"] in ("sent", "open"):
+                    qty = order["sz"] - order["filled"]
+                else:
+                    qty = order["filled"]
+                delta += -qty if order["is_buy"] else qty
+        return delta
+
+    def has_unresolved(self) -> bool:
+        with self._lock:
+            return any(o["status"] in ("sent", "open") for o in self.orders.values())
+
+    def resolve(self, info, user: str):
+        """Опросить биржу по ордерам с неизвестным исходом. Возвращает cloid завершенных ордеров"""
+        with self._lock:
+            unresolved = [o for o in self.orders.values() if o["status"] in ("sent", "open")]
+
+        for order in unresolved:
+            result = info.query_order_by_cloid(user, Cloid.from_str(order["cloid"]))
+            with self._lock:
+                if result.get("status") == "order":
+                    status = result["order"]["status"]
+                    order["status"] = "open" if status in LIVE_STATUSES else status
+                elif time.time() - order["sent_at"] > self.lost_after:
+                    # Биржа так и не узнала этот cloid - ордер не дошел
+                    order["status"] = "lost"
+
+        with self._lock:
+            return [c for c, o in self.orders.items() if o["status"] not in ("sent", "open")]
+
+    def is_known(self, info, user: str, cloid: Cloid) -> bool:
+        return info.query_order_by_cloid(user, cloid).get("status") == "order"
+
+    def drop(self, cloids):
+        with self._lock:
+            for cloid in cloids:
+                self.orders.pop(cloid, None)
+        self._changed()
+
+    def pending(self):
+        with self._lock:
+            return [dict(o) for o in self.orders.values()]
+
+    def restore(self, orders):
+        """
+        Вернуть ордера из чекпоинта. Незавершенные заново опрашиваются через resolve(),
+        завершенные гасятся следующим settle вместе с перечитыванием позиции
+        """
+        with self._lock:
+            for order in orders:
+                self.orders[order["cloid"]] = dict(order)
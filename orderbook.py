@@ -0,0 +1,88 @@
+"""
+Локальный L2 стакан и расчет лимитной цены под нужный объем
+"""
+
+import threading
+import time
+
+
+class L2BookCache:
+    """
+    Кэш L2 стакана одной монеты. Обновляется либо запросом l2_snapshot раз в ttl секунд,
+    либо стримом: info.subscribe({"type": "l2Book", "coin": coin}, cache.on_message)
+    """
+
+    def __init__(self, info, coin: str = "ETH", ttl: float = 1.0, max_slippage: float = 0.005):
+        self.info = info
+        self.coin = coin
+        self.ttl = ttl
+        self.max_slippage = max_slippage  # Максимальное отклонение худшего уровня от mid
+
+        self.bids = []  # [(px, sz)] по убыванию цены
+        self.asks = []  # [(px, sz)] по возрастанию цены
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+
+    def on_message(self, msg):
+        """Callback для websocket-подписки l2Book"""
+        self._apply(msg.get("data", msg))
+
+    def refresh(self):
+        self._apply(self.info.l2_snapshot(self.coin))
+
+    def get(self):
+        if time.monotonic() - self.updated_at >= self.ttl:
+            self.refresh()
+        with self._lock:
+            return self.bids, self.asks
+
+    def mid_price(self) -> float:
+        bids, asks = self.get()
+        if not bids or not asks:
+            return 0.0
+        return (bids[0][0] + asks[0][0]) / 2
+
+    def plan_order(self, is_buy: bool, size: float):
+        """
+        Подобрать лимитную цену по худшему уровню, нужному для исполнения size.
+        Уровни дальше mid * (1 ± max_slippage) не берутся - объем урезается до доступного в пределах капа,
+        остаток добирается на следующих тиках.
+        Возвращает (limit_px, size, expected_avg_px)
+        """
+        bids, asks = self.get()
+        if not bids or not asks:
+            return 0.0, size, 0.0
+
+        mid = (bids[0][0] + asks[0][0]) / 2
+        cap_px = mid * (1 + self.max_slippage) if is_buy else mid * (1 - self.max_slippage)
+        levels = asks if is_buy else bids
+
+        filled = 0.0
+        notional = 0.0
+        limit_px = levels[0][0]
+        for px, sz in levels:
+            if (is_buy and px > cap_px) or (not is_buy and px < cap_px):
+                break
+            take = min(size - filled, sz)
+            filled += take
+            notional += take * px
+            limit_px = px
+            if filled >= size:
+                break
+
+        if filled <= 0:
+            # Даже лучший уровень за капом - ставим цену по капу, IOC возьмет что сможет
+            return cap_px, size, cap_px
+
+        return limit_px, filled, notional / filled
+
+    def _apply(self, snapshot):
+        if not snapshot or "levels" not in snapshot:
+            return
+        bids_raw, asks_raw = snapshot["levels"]
+        bids = [(float(l["px"]), float(l["sz"])) for l in bids_raw]
+        asks = [(float(l["px"]), float(l["sz"])) for l in asks_raw]
+        with self._lock:
+            self.bids = bids
+            self.asks = asks
+            self.updated_at = time.monotonic()
@@ -0,0 +1,394 @@
+"""
+Paper-trading: локальный матчер ордеров по L2 стакану вместо exchange.order
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def _fmt(x: float) -> str:
+    """Число в строку в формате ответов Hyperliquid ("1891.4", "0.0123")"""
+    s = f"{x:.8f}".rstrip("0").rstrip(".")
+    return s if s not in ("", "-0") else "0"
+
+
+class LiveBookSource:
+    """Стакан с биржи: один l2_snapshot на тик"""
+
+    def __init__(self, info, coin: str = "ETH"):
+        self.info = info
+        self.coin = coin
+        self.snapshot = None
+        self.ekubo = None
+        self.exhausted = False
+
+    def current(self):
+        if self.snapshot is None:
+            self.advance()
+        return self.snapshot
+
+    def advance(self) -> bool:
+        self.snapshot = self.info.l2_snapshot(self.coin)
+        return True
+
+
+class RecordedBookSource:
+    """
+    Стакан из записанного файла (JSONL): каждая строка - {"book": <l2_snapshot>, "ekubo": [eth, usdc]}
+    или просто l2_snapshot. Файл читается лениво, поэтому длинные записи не грузятся в память.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "r")
+        self._fresh = False
+        self.snapshot = None
+        self.ekubo = None
+        self.exhausted = False
+
+    def current(self):
+        if self.snapshot is None:
+            self._read_next()
+            self._fresh = True
+        return self.snapshot
+
+    def advance(self) -> bool:
+        # Первый снапшот уже прочитан через current() - не пропускаем его
+        if self._fresh:
+            self._fresh = False
+            return True
+        return self._read_next()
+
+    def _read_next(self) -> bool:
+        for line in self._file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "book" in record:
+                self.snapshot = record["book"]
+                self.ekubo = record.get("ekubo")
+            else:
+                self.snapshot = record
+            return True
+
+        self.exhausted = True
+        self._file.close()
+        return False
+
+
+class PaperExchange:
+    """
+    Симулятор исполнения с интерфейсом Exchange.order из hyperliquid-python-sdk.
+    IOC добивается по уровням стакана (частичные исполнения, проскальзывание, taker fee),
+    ALO встает в книгу и исполняется на следующих снапшотах по своей цене (maker fee).
+    """
+
+    def __init__(
+        self,
+        book,
+        coin: str = "ETH",
+        taker_fee: float = 0.00045,
+        maker_fee: float = 0.00015,
+        slippage_bps: float = 0.0,
+        balance: float = 10000.0
+    ):
+        self.book = book
+        self.coin = coin
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.slippage_bps = slippage_bps
+
+        self.balance = balance
+        self.szi = 0.0
+        self.entry_px = 0.0
+        self.realized_pnl = 0.0
+        self.fees_paid = 0.0
+
+        self.resting = []
+        self.order_statuses = {}  # cloid -> статус для query_order_by_cloid
+        self.order_count = 0
+        self.fill_count = 0
+        self._next_oid = 1
+        # Объем, уже снятый с уровней текущего снапшота: {(is_bid, px): sz}
+        self._consumed = {}
+
+    def advance(self) -> bool:
+        """Перейти к следующему снапшоту стакана и исполнить стоящие ALO ордера"""
+        ok = self.book.advance()
+        self._consumed = {}
+        if ok:
+            self._match_resting()
+        return ok
+
+    def levels(self):
+        """(bids, asks) как списки (px, sz) с учетом уже снятого объема"""
+        snapshot = self.book.current()
+        if not snapshot:
+            return [], []
+        bids_raw, asks_raw = snapshot["levels"]
+        bids = [(float(l["px"]), float(l["sz"]) - self._consumed.get((True, float(l["px"])), 0.0)) for l in bids_raw]
+        asks = [(float(l["px"]), float(l["sz"]) - self._consumed.get((False, float(l["px"])), 0.0)) for l in asks_raw]
+        return [l for l in bids if l[1] > 1e-12], [l for l in asks if l[1] > 1e-12]
+
+    def mid_price(self) -> float:
+        snapshot = self.book.current()
+        if not snapshot:
+            return 0.0
+        bids_raw, asks_raw = snapshot["levels"]
+        if not bids_raw or not asks_raw:
+            return 0.0
+        return (float(bids_raw[0]["px"]) + float(asks_raw[0]["px"])) / 2
+
+    def order(self, name, is_buy, sz, limit_px, order_type, reduce_only=False, cloid=None, builder=None):
+        self.order_count += 1
+        result = self._place(name, is_buy, sz, limit_px, order_type, reduce_only, cloid)
+
+        if cloid is not None:
+            status = result["response"]["data"]["statuses"][0]
+            if "filled" in status:
+                self.order_statuses[cloid.to_raw()] = "filled"
+            elif "resting" in status:
+                self.order_statuses[cloid.to_raw()] = "open"
+            else:
+                self.order_statuses[cloid.to_raw()] = "rejected"
+        return result
+
+    def query_order_by_cloid(self, cloid):
+        status = self.order_statuses.get(cloid.to_raw())
+        if status is None:
+            return {"status": "unknownOid"}
+        return {"status": "order", "order": {"order": {"coin": self.coin, "cloid": cloid.to_raw()}, "status": status}}
+
+    def _place(self, name, is_buy, sz, limit_px, order_type, reduce_only, cloid):
+        if name != self.coin:
+            return self._response({"error": f"Unknown coin {name}"})
+
+        tif = order_type.get("limit", {}).get("tif", "Gtc")
+        sz = float(sz)
+        limit_px = float(limit_px)
+
+        if reduce_only:
+            reducing = (is_buy and self.szi < 0) or (not is_buy and self.szi > 0)
+            if not reducing:
+                return self._response({"error": "Reduce only order would increase position."})
+            sz = min(sz, abs(self.szi))
+
+        bids, asks = self.levels()
+        opposite = asks if is_buy else bids
+
+        if tif == "Alo":
+            crosses = opposite and (opposite[0][0] <= limit_px if is_buy else opposite[0][0] >= limit_px)
+            if crosses:
+                return self._response({"error": "Post only order would have immediately matched"})
+            return self._response({"resting": {"oid": self._rest(is_buy, sz, limit_px, reduce_only, cloid)}})
+
+        filled_sz, notional = self._sweep(is_buy, sz, limit_px, opposite)
+
+        if filled_sz <= 0:
+            if tif == "Ioc":
+                return self._response({"error": "Order could not immediately match against any resting orders."})
+            return self._response({"resting": {"oid": self._rest(is_buy, sz, limit_px, reduce_only, cloid)}})
+
+        # Проскальзывание сверх стакана - всегда против нас
+        slip = self.slippage_bps / 10000
+        avg_px = notional / filled_sz * (1 + slip if is_buy else 1 - slip)
+        oid = self._new_oid()
+        self._apply_fill(is_buy, filled_sz, avg_px, self.taker_fee)
+
+        if tif == "Gtc" and sz - filled_sz > 1e-12:
+            self._rest(is_buy, sz - filled_sz, limit_px, reduce_only, cloid, oid=oid)
+
+        return self._response({"filled": {"totalSz": _fmt(filled_sz), "avgPx": _fmt(avg_px), "oid": oid}})
+
+    def cancel(self, name, oid):
+        before = len(self.resting)
+        for o in self.resting:
+            if o["oid"] == oid and o["cloid"] is not None:
+                self.order_statuses[o["cloid"].to_raw()] = "canceled"
+        self.resting = [o for o in self.resting if o["oid"] != oid]
+        if len(self.resting) == before:
+            return self._response({"error": "Order was never placed, already canceled, or filled."}, kind="cancel")
+        return self._response("success", kind="cancel")
+
+    def user_state(self):
+        asset_positions = []
+        unrealized = 0.0
+        if abs(self.szi) > 1e-12:
+            mid = self.mid_price()
+            unrealized = self.szi * (mid - self.entry_px)
+            asset_positions.append({
+                "type": "oneWay",
+                "position": {
+                    "coin": self.coin,
+                    "szi": _fmt(self.szi),
+                    "entryPx": _fmt(self.entry_px),
+                    "positionValue": _fmt(abs(self.szi) * mid),
+                    "unrealizedPnl": _fmt(unrealized),
+                }
+            })
+
+        return {
+            "assetPositions": asset_positions,
+            "marginSummary": {"accountValue": _fmt(self.balance + unrealized)},
+        }
+
+    def _sweep(self, is_buy, sz, limit_px, opposite):
+        """Снять объем с уровней стакана до limit_px. Возвращает (filled_sz, notional)"""
+        remaining = sz
+        notional = 0.0
+        for px, level_sz in opposite:
+            if remaining <= 1e-12:
+                break
+            if (is_buy and px > limit_px) or (not is_buy and px < limit_px):
+                break
+            take = min(remaining, level_sz)
+            key = (not is_buy, px)
+            self._consumed[key] = self._consumed.get(key, 0.0) + take
+            notional += take * px
+            remaining -= take
+        return round(sz - remaining, 8), notional
+
+    def _match_resting(self):
+        still_resting = []
+        for o in self.resting:
+            bids, asks = self.levels()
+            opposite = asks if o["is_buy"] else bids
+            filled_sz, _ = self._sweep(o["is_buy"], o["sz"], o["px"], opposite)
+            if filled_sz > 0:
+                # Мейкер исполняется по своей цене
+                self._apply_fill(o["is_buy"], filled_sz, o["px"], self.maker_fee)
+                o["sz"] = round(o["sz"] - filled_sz, 8)
+            if o["sz"] > 1e-12:
+                still_resting.append(o)
+            elif o["cloid"] is not None:
+                self.order_statuses[o["cloid"].to_raw()] = "filled"
+        self.resting = still_resting
+
+    def _apply_fill(self, is_buy, sz, px, fee_rate):
+        self.fill_count += 1
+        signed = sz if is_buy else -sz
+        fee = sz * px * fee_rate
+
+        if self.szi == 0 or (self.szi > 0) == is_buy:
+            total = abs(self.szi) + sz
+            self.entry_px = (abs(self.szi) * self.entry_px + sz * px) / total
+        else:
+            closed = min(sz, abs(self.szi))
+            pnl = closed * (px - self.entry_px) * (1 if self.szi > 0 else -1)
+            self.realized_pnl += pnl
+            self.balance += pnl
+            if sz > abs(self.szi):
+                self.entry_px = px
+
+        self.szi = round(self.szi + signed, 8)
+        if self.szi == 0:
+            self.entry_px = 0.0
+        self.fees_paid += fee
+        self.balance -= fee
+
+    def _rest(self, is_buy, sz, px, reduce_only, cloid, oid=None):
+        oid = oid or self._new_oid()
+        self.resting.append({
+            "oid": oid,
+            "is_buy": is_buy,
+            "sz": sz,
+            "px": px,
+            "reduce_only": reduce_only,
+            "cloid": cloid,
+        })
+        return oid
+
+    def _new_oid(self) -> int:
+        oid = self._next_oid
+        self._next_oid += 1
+        return oid
+
+    def _response(self, status, kind="order"):
+        return {"status": "ok", "response": {"type": kind, "data": {"statuses": [status]}}}
+
+
+class PaperInfo:
+    """Подмена Info: цены и стакан из источника PaperExchange, позиция - симулированная"""
+
+    def __init__(self, exchange: PaperExchange):
+        self.exchange = exchange
+
+    def all_mids(self):
+        return {self.exchange.coin: _fmt(self.exchange.mid_price())}
+
+    def l2_snapshot(self, name):
+        return self.exchange.book.current()
+
+    def user_state(self, address):
+        return self.exchange.user_state()
+
+    def query_order_by_cloid(self, user, cloid):
+        return self.exchange.query_order_by_cloid(cloid)
+
+
+def record(path: str, n_ticks: int, interval: float):
+    """Записать живой стакан ETH и состояние пула Ekubo в файл для последующего replay"""
+    os.environ["PAPER_TRADING"] = "1"
+    os.environ.pop("PAPER_BOOK_FILE", None)
+    from hyperliquid_client import HyperliquidClient
+
+    client = HyperliquidClient()
+    with open(path, "a") as f:
+        for i in range(n_ticks):
+            client.exchange.advance()
+            success, ekubo = client.get_ekubo_positions()
+            record = {"book": client.exchange.book.current()}
+            if success:
+                record["ekubo"] = list(ekubo)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            print(f"   {i + 1}/{n_ticks} записано")
+            time.sleep(interval)
+
+
+def replay(path: str):
+    """Прогнать цикл решений по записанному стакану без пауз между тиками"""
+    os.environ["PAPER_TRADING"] = "1"
+    os.environ["PAPER_BOOK_FILE"] = path
+    from hyperliquid_client import HyperliquidClient
+
+    client = HyperliquidClient()
+    exchange = client.exchange
+    actions = {
+        "place_min_short": client.place_min_short,
+        "place_max_short": client.place_max_short,
+        "decrease": client.decrease_short,
+        "increase": client.increase_short,
+    }
+
+    ticks = 0
+    started = time.perf_counter()
+    while True:
+        success, action = client.check_to_change_position()
+        if exchange.book.exhausted:
+            break
+        ticks += 1
+        if success and action in actions:
+            actions[action]()
+
+    elapsed = time.perf_counter() - started
+    print(f"Тиков: {ticks} за {elapsed:.2f} сек ({ticks / elapsed if elapsed else 0:.0f} тиков/сек)")
+    print(f"Ордеров: {exchange.order_count}, исполнений: {exchange.fill_count}")
+    print(f"Позиция: {exchange.szi} ETH @ {exchange.entry_px:.2f}")
+    print(f"Realized PnL: {exchange.realized_pnl:.2f} USD, комиссии: {exchange.fees_paid:.2f} USD")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "record":
+        n = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        interval = float(sys.argv[4]) if len(sys.argv) > 4 else 1.0
+        record(sys.argv[2], n, interval)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "replay":
+        replay(sys.argv[2])
+    else:
+        print("Использование:")
+        print("  python paper_exchange.py record <файл.jsonl> [тиков] [интервал_сек]")
+        print("  python paper_exchange.py replay <файл.jsonl>")
@@ -0,0 +1,115 @@
+"""
+Профилирование живого цикла по требованию: cProfile и tracemalloc на N тиков
+"""
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+
+class TickProfiler:
+    """
+    Оборачивает тик цикла мониторинга. Пока профилирование не заказано,
+    run() просто вызывает функцию - никакого оверхеда не остается.
+    start_* только заказывают замер, сам он начинается с ближайшего тика
+    """
+
+    def __init__(self, top: int = 25):
+        self.top = top
+        self._cpu_requested = 0
+        self._mem_requested = 0
+        self.cpu_ticks_left = 0
+        self.mem_ticks_left = 0
+        self._cpu_ticks = 0
+        self._mem_ticks = 0
+        self._profile = None
+        self._mem_start = None
+
+    def start_cpu(self, n_ticks: int):
+        if self._cpu_requested or self._profile is not None:
+            raise RuntimeError("cProfile уже запущен")
+        self._cpu_requested = n_ticks
+
+    def start_mem(self, n_ticks: int):
+        if self._mem_requested or self._mem_start is not None:
+            raise RuntimeError("tracemalloc уже запущен")
+        self._mem_requested = n_ticks
+
+    def stop(self):
+        """Цикл остановлен: начатые замеры сбрасываются, tracemalloc выключается. Заказанные остаются"""
+        self._profile = None
+        self.cpu_ticks_left = 0
+        if self._mem_start is not None:
+            self._mem_start = None
+            self.mem_ticks_left = 0
+            tracemalloc.stop()
+
+    def _begin(self):
+        if self._cpu_requested and self._profile is None:
+            self.cpu_ticks_left = self._cpu_ticks = self._cpu_requested
+            self._profile = cProfile.Profile()
+            self._cpu_requested = 0
+
+        if self._mem_requested and self._mem_start is None:
+            self.mem_ticks_left = self._mem_ticks = self._mem_requested
+            tracemalloc.start(10)
+            self._mem_start = tracemalloc.take_snapshot()
+            self._mem_requested = 0
+
+    def run(self, func):
+        """Выполнить тик. Возвращает (результат func, [(название, текст отчета)])"""
+        self._begin()
+        # Замеры тика фиксируются до вызова: команда посреди тика не попадет в его подсчет
+        profile, mem_start = self._profile, self._mem_start
+
+        if profile is not None:
+            result = profile.runcall(func)
+        else:
+            result = func()
+
+        reports = []
+        if profile is not None:
+            self.cpu_ticks_left -= 1
+            if self.cpu_ticks_left <= 0:
+                self._profile = None
+                reports.append(self._report(f"cpu_profile_{self._cpu_ticks}_ticks.txt", self._cpu_report, profile))
+
+        if mem_start is not None:
+            self.mem_ticks_left -= 1
+            if self.mem_ticks_left <= 0:
+                self._mem_start = None
+                reports.append(self._report(f"mem_profile_{self._mem_ticks}_ticks.txt", self._mem_report, mem_start))
+
+        return result, reports
+
+    def _report(self, filename, build, data):
+        # Сбой отчета не должен останавливать цикл мониторинга
+        try:
+            return filename, build(data)
+        except Exception as e:
+            return filename, f"Не удалось построить отчет: {e}"
+
+    def _cpu_report(self, profile) -> str:
+        out = io.StringIO()
+        out.write(f"cProfile за {self._cpu_ticks} тиков, топ {self.top} по собственному времени\n\n")
+        stats = pstats.Stats(profile, stream=out)
+        stats.strip_dirs().sort_stats("tottime").print_stats(self.top)
+        return out.getvalue()
+
+    def _mem_report(self, start) -> str:
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        lines = [
+            f"tracemalloc за {self._mem_ticks} тиков",
+            f"Текущая: {current / 1024:.1f} KiB, пик: {peak / 1024:.1f} KiB",
+            "",
+            f"Топ {self.top} мест аллокаций (прирост с начала замера):",
+        ]
+        for stat in snapshot.compare_to(start, "lineno")[:self.top]:
+            lines.append(str(stat))
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+"""
+Сценарный риск LP позиции Ekubo + шорт на Hyperliquid: сетка цена × время одним проходом NumPy
+"""
+
+import numpy as np
+from ekubo_config import LOWER_TICK, UPPER_TICK
+
+# Цена Ekubo: 1.000001^tick в сырых единицах token1/token0 (USDC 6 знаков / ETH 18 знаков)
+TICK_BASE = 1.000001
+DECIMALS_SCALE = 10 ** (18 - 6)
+
+TABLE_MOVES = (-20, -10, -5, -2, 0, 2, 5, 10, 20)
+
+
+def tick_to_price(tick: int) -> float:
+    return TICK_BASE ** tick * DECIMALS_SCALE
+
+
+def liquidity_from_amounts(eth: float, usdc: float, price: float, pa: float, pb: float) -> float:
+    """Ликвидность в единицах sqrt(USDC·ETH), восстановленная из текущего состава позиции"""
+    sp, sa, sb = np.sqrt(price), np.sqrt(pa), np.sqrt(pb)
+    if price <= pa:
+        return eth / (1 / sa - 1 / sb)
+    if price >= pb:
+        return usdc / (sb - sa)
+    # Внутри диапазона - через стоимость, она устойчива к расхождению цены пула и HL
+    return (eth * price + usdc) / (2 * sp - sa - price / sb)
+
+
+def lp_amounts(prices, liquidity: float, pa: float, pb: float):
+    """(ETH, USDC) позиции для массива цен"""
+    sp = np.sqrt(np.clip(prices, pa, pb))
+    sa, sb = np.sqrt(pa), np.sqrt(pb)
+    return liquidity * (1 / sp - 1 / sb), liquidity * (sp - sa)
+
+
+def risk_grid(price: float, eth: float, usdc: float, short: float, delta: float, funding_rate: float,
+              max_move: float = 0.3, n_prices: int = 601, max_hours: int = 168):
+    """
+    PnL, чистая дельта и фандинг на сетке (цена, часы).
+    short - текущий шорт в ETH (лонг - отрицательный), funding_rate - часовая ставка (шорт получает при > 0)
+    """
+    pa, pb = tick_to_price(LOWER_TICK), tick_to_price(UPPER_TICK)
+    liquidity = liquidity_from_amounts(eth, usdc, price, pa, pb)
+
+    moves = np.linspace(-max_move, max_move, n_prices)
+    hours = np.arange(max_hours + 1)
+    prices = price * (1 + moves)
+
+    lp_eth, lp_usdc = lp_amounts(prices, liquidity, pa, pb)
+    lp_value0 = eth * price + usdc
+    lp_pnl = lp_eth * prices + lp_usdc - lp_value0
+    short_pnl = short * (price - prices)
+
+    # Что выставит цикл в каждой точке: вне диапазона place_min_short/place_max_short, внутри - пул × delta
+    target_short = np.where(lp_eth < 0.001, 0.001, lp_eth * delta)
+
+    funding = short * prices[:, None] * funding_rate * hours[None, :]
+    pnl = (lp_pnl + short_pnl)[:, None] + funding
+
+    return {
+        "price": price,
+        "range": (pa, pb),
+        "short": short,
+        "funding_rate": funding_rate,
+        "moves": moves,
+        "hours": hours,
+        "prices": prices,
+        "lp_eth": lp_eth,
+        "lp_pnl": lp_pnl,
+        "short_pnl": short_pnl,
+        "net_delta": lp_eth - short,
+        "rehedge_size": target_short - short,
+        "funding": funding,
+        "pnl": pnl,
+    }
+
+
+def format_risk_table(grid, moves_pct=TABLE_MOVES) -> str:
+    pa, pb = grid["range"]
+    lines = [
+        f"ETH ${grid['price']:.2f} | шорт {grid['short']:.4f} ETH | фандинг {grid['funding_rate'] * 100:.4f}%/ч",
+        f"Диапазон ${pa:.0f} - ${pb:.0f}",
+        f"  < ${pa:.0f}: place_max_short | > ${pb:.0f}: place_min_short",
+        "",
+        f"{'Δ%':>4} {'Цена':>7} {'LP ETH':>7} {'PnL':>8} {'Δнет':>7} {'Ребал':>7} {'24ч':>8} {'7д':>8}",
+    ]
+
+    h24 = min(24, grid["hours"][-1])
+    h7d = grid["hours"][-1]
+    for move in moves_pct:
+        i = int(np.abs(grid["moves"] * 100 - move).argmin())
+        lines.append(
+            f"{move:>+4d} {grid['prices'][i]:>7.0f} {grid['lp_eth'][i]:>7.3f} {grid['pnl'][i, 0]:>8.1f} "
+            f"{grid['net_delta'][i]:>+7.3f} {grid['rehedge_size'][i]:>+7.3f} {grid['pnl'][i, h24]:>8.1f} {grid['pnl'][i, h7d]:>8.1f}"
+        )
+
+    return "\n".join(lines)
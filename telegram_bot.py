@@ -1,20 +1,19 @@
+import html
+import io
 import os
 import asyncio
-import signal
-import sys
-from datetime import datetime
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 from dotenv import load_dotenv
-from hyperliquid_client import HyperliquidClient
+from engine_ipc import EngineClient
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ALLOWED_USER_ID = int(os.getenv("TELEGRAM_ALLOWED_USERS", "0"))
 
-client = None
-monitoring_task = None
+# Хеджер работает отдельным процессом (hedge_engine.py), бот только шлет команды и читает события
+engine = EngineClient()
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != ALLOWED_USER_ID:
@@ -31,6 +30,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /start_monitoring - Запустить софт
 /stop_monitoring - Остановить софт
 /status - Текущие настройки
+/risk - Сценарии PnL/дельты пула и шорта при движении ETH
+/profile <тиков> - cProfile цикла на N тиков
+/memprofile [тиков] - tracemalloc цикла на N тиков (по умолчанию 1)
     """
     await update.message.reply_text(welcome_text)
 
@@ -40,8 +42,6 @@ async def set_deviation_command(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client
-    
     if not context.args:
         await update.message.reply_text("❌ Укажите значение: /set_deviation 0.002")
         return
@@ -52,11 +52,11 @@ async def set_deviation_command(update: Update, context: ContextTypes.DEFAULT_TY
             await update.message.reply_text("❌ Отклонение должно быть > 0")
             return
         
-        if client is None:
-            await update.message.reply_text("⏳ Инициализация клиента, подождите...")
-            client = HyperliquidClient()
+        reply = await engine.request("set_deviation", value=deviation)
+        if not reply["ok"]:
+            await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+            return
         
-        client.set_deviation(deviation)
         await update.message.reply_text(f"✅ Deviation установлен: {deviation}")
         
     except ValueError:
@@ -68,8 +68,6 @@ async def set_timeout_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client
-    
     if not context.args:
         await update.message.reply_text("❌ Укажите значение: /set_timeout 60")
         return
@@ -80,11 +78,11 @@ async def set_timeout_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_text("❌ Таймаут должен быть >= 10 секунд")
             return
         
-        if client is None:
-            await update.message.reply_text("⏳ Инициализация клиента, подождите...")
-            client = HyperliquidClient()
+        reply = await engine.request("set_timeout", value=timeout)
+        if not reply["ok"]:
+            await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+            return
         
-        client.set_timeout(timeout)
         await update.message.reply_text(f"✅ Timeout установлен: {timeout} сек")
         
     except ValueError:
@@ -96,8 +94,6 @@ async def set_delta_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client
-    
     if not context.args:
         await update.message.reply_text("❌ Укажите значение: /set_delta 1.0")
         await update.message.reply_text("💡 Примеры:\n  /set_delta 1.0 - дельта-нейтральная (шорт = пул)\n  /set_delta 0.5 - шорт в 2 раза меньше пула\n  /set_delta 1.5 - шорт в 1.5 раза больше пула")
@@ -109,11 +105,11 @@ async def set_delta_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Delta должна быть > 0")
             return
         
-        if client is None:
-            await update.message.reply_text("⏳ Инициализация клиента, подождите...")
-            client = HyperliquidClient()
+        reply = await engine.request("set_delta", value=delta)
+        if not reply["ok"]:
+            await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+            return
         
-        client.set_delta(delta)
         await update.message.reply_text(f"✅ Delta установлена: {delta}\n💡 Целевой шорт = Ekubo пул × {delta}")
         
     except ValueError:
@@ -125,16 +121,20 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client, monitoring_task
+    status = await engine.request("status")
+    
+    if not status["ok"]:
+        await update.message.reply_text(f"❌ Ошибка: {status['error']}")
+        return
     
-    if client is None:
+    if not status["initialized"]:
         await update.message.reply_text("⚠️ Клиент не инициализирован")
         return
     
-    is_running = monitoring_task is not None and not monitoring_task.done()
+    is_running = status["monitoring"]
     
-    ekubo_success, ekubo_data = client.get_ekubo_positions()
-    fees_success, fees_data = client.get_ekubo_fees()
+    ekubo_success, ekubo_data = status["ekubo"]
+    fees_success, fees_data = status["fees"]
     
     if ekubo_success:
         eth_in_pool = round(ekubo_data[0], 5)
@@ -151,7 +151,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         fees_status = f"❌ Ошибка: {fees_data}"
 
     try:
-        hl_position = client.get_hl_positions()
+        hl_position = status["hl_position"]
         if hl_position:
             short_size = float(hl_position['szi'])
             short_entry = float(hl_position['entryPx'])
@@ -164,7 +164,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Вычисляем целевой шорт с учетом delta
     target_short = 0
     if ekubo_success:
-        target_short = round(ekubo_data[0] * client.get_delta(), 5)
+        target_short = round(ekubo_data[0] * status["delta"], 5)
     
     status_text = f"""
 📊 Статус бота:
@@ -172,11 +172,11 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 🔄 Мониторинг: {'🟢 Запущен' if is_running else '🔴 Остановлен'}
 
 ⚙️ Параметры:
-  Deviation: {client.get_deviation()} ETH
-  Timeout: {client.get_timeout()} sec
-  Delta: {client.get_delta()}
+  Deviation: {status["deviation"]} ETH
+  Timeout: {status["timeout"]} sec
+  Delta: {status["delta"]}
   
-💰 ETH price: ${client.get_eth_price():.2f}
+💰 ETH price: ${status["eth_price"]:.2f}
 
 🏊 Ekubo pool: {ekubo_status}
 🎯 Target short: {target_short} ETH
@@ -192,144 +192,148 @@ async def start_monitoring_command(update: Update, context: ContextTypes.DEFAULT
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client, monitoring_task
+    await update.message.reply_text("🚀 Запуск мониторинга очка Егора...")
+    
+    reply = await engine.request("start_monitoring", chat_id=update.effective_chat.id)
+    
+    if not reply["ok"]:
+        await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+        return
     
-    if monitoring_task is not None and not monitoring_task.done():
+    if reply["already_running"]:
         await update.message.reply_text("⚠️ Мониторинг уже запущен")
         return
     
-    if client is None:
-        await update.message.reply_text("⏳ Инициализация клиента, подождите...")
-        client = HyperliquidClient()
+    await update.message.reply_text("✅ Мониторинг очка Егора запущен!")
+
+
+async def stop_monitoring_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != ALLOWED_USER_ID:
+        await update.message.reply_text("❌ Нет доступа")
+        return
     
-    client.start_control_loop()
+    await update.message.reply_text("🛑 Остановка мониторинга очка Егора...")
     
-    client.telegram_chat_id = update.effective_chat.id
-    client.telegram_bot = context.bot
+    reply = await engine.request("stop_monitoring")
     
-    await update.message.reply_text("🚀 Запуск мониторинга очка Егора...")
+    if not reply["ok"]:
+        await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+        return
     
-    monitoring_task = asyncio.create_task(run_monitoring_loop(client))
+    if not reply["was_running"]:
+        await update.message.reply_text("⚠️ Мониторинг не запущен")
+        return
     
-    await update.message.reply_text("✅ Мониторинг очка Егора запущен!")
+    await update.message.reply_text("✅ Мониторинг очка Егора остановлен")
 
 
-async def stop_monitoring_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def risk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != ALLOWED_USER_ID:
         await update.message.reply_text("❌ Нет доступа")
         return
     
-    global client, monitoring_task
+    reply = await engine.request("risk")
     
-    if monitoring_task is None or monitoring_task.done():
-        await update.message.reply_text("⚠️ Мониторинг не запущен")
+    if not reply["ok"]:
+        await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
         return
     
-    client.stop_control_loop()
-    await update.message.reply_text("🛑 Остановка мониторинга очка Егора...")
+    if reply["text"] is None:
+        await update.message.reply_text("⚠️ Нет данных: снапшот появится после первого тика или /status")
+        return
     
-    await monitoring_task
-    monitoring_task = None
+    # Таблица читается только моноширинным шрифтом
+    text = html.escape(reply["text"])
+    await update.message.reply_text(f"<pre>{text}</pre>\nДанные {reply['age']:.0f} сек назад", parse_mode="HTML")
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != ALLOWED_USER_ID:
+        await update.message.reply_text("❌ Нет доступа")
+        return
     
-    await update.message.reply_text("✅ Мониторинг очка Егора остановлен")
+    if not context.args:
+        await update.message.reply_text("❌ Укажите число тиков: /profile 10")
+        return
+    
+    try:
+        n_ticks = int(context.args[0])
+        if n_ticks <= 0:
+            await update.message.reply_text("❌ Число тиков должно быть > 0")
+            return
+        
+        reply = await engine.request("profile", n_ticks=n_ticks)
+        if not reply["ok"]:
+            await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+            return
+        
+        await update.message.reply_text(f"🔬 cProfile включен на {n_ticks} тиков, отчет придет после них")
+        if not reply["monitoring"]:
+            await update.message.reply_text("⚠️ Мониторинг не запущен - профиль начнется после /start_monitoring")
+        
+    except ValueError:
+        await update.message.reply_text("❌ Неверный формат числа")
 
 
-async def run_monitoring_loop(client: HyperliquidClient):
+async def memprofile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != ALLOWED_USER_ID:
+        await update.message.reply_text("❌ Нет доступа")
+        return
+    
     try:
-        while client.control_loop_flag:
-            try:
-                success, action = client.check_to_change_position()
-                
-                current_time = datetime.now().strftime("%H:%M:%S %d.%m.%Y")
-                message = f"⏰ {current_time}\n"
-                
-                if success:
-                    message += f"🔄 Действие: {action}\n"
-                    
-                    if action == "place_min_short":
-                        result_success, result = client.place_min_short()
-                        message += f"   Выставлен минимальный шорт: {'✅' if result_success else '❌'}\n"
-                    elif action == "place_max_short":
-                        result_success, result = client.place_max_short()
-                        message += f"   Выставлен максимальный шорт: {'✅' if result_success else '❌'}\n"
-                    elif action == "decrease":
-                        result_success, result = client.decrease_short()
-                        message += f"   Уменьшен шорт: {'✅' if result_success else '❌'}\n"
-                    elif action == "increase":
-                        result_success, result = client.increase_short()
-                        message += f"   Увеличен шорт: {'✅' if result_success else '❌'}\n"
-                    
-                    if result_success and isinstance(result, dict):
-                        filled = result.get('response', {}).get('data', {}).get('statuses', [{}])[0].get('filled')
-                        if filled:
-                            message += f"   Исполнено: {filled.get('totalSz')} ETH @ ${filled.get('avgPx')}"
-                else:
-                    message += f"✅ {action}"
-                
-                hl_eth = 0
-                hl_pos = client.get_hl_positions()
-                if hl_pos:
-                    hl_eth = round(float(hl_pos['szi']), 5)
-                
-                ekubo_eth = 0
-                ekubo_usdc = 0
-                success, ekubo_pos = client.get_ekubo_positions()
-                if success:
-                    ekubo_eth = round(ekubo_pos[0], 5)
-                    ekubo_usdc = round(ekubo_pos[1], 2)
-                
-                eth_fees = 0
-                usdc_fees = 0
-                success, ekubo_fees = client.get_ekubo_fees()
-                if success:
-                    eth_fees = round(ekubo_fees[0], 5)
-                    usdc_fees = round(ekubo_fees[1], 2)
-                
-                message += "=====================\n"
-                message += f"HL short: {hl_eth} ETH\n"
-                message += f"Ekubo pool: {ekubo_eth} ETH | {ekubo_usdc} USDC\n"
-                message += f"Ekubo fees: {eth_fees} ETH | {usdc_fees} USDC\n"
-                message += "=====================\n"
-                    
-                if hasattr(client, 'telegram_bot') and client.telegram_bot:
-                    await client.telegram_bot.send_message(
-                        chat_id=client.telegram_chat_id,
-                        text=message
-                    )
-                
-            except Exception as e:
-                error_msg = f"❌ Ошибка в цикле: {e}"
-                if hasattr(client, 'telegram_bot') and client.telegram_bot:
-                    await client.telegram_bot.send_message(
-                        chat_id=client.telegram_chat_id,
-                        text=error_msg
-                    )
-            
-            await asyncio.sleep(client.get_timeout())
-    except asyncio.CancelledError:
-        print("   Задача мониторинга отменена")
-        raise
-
-
-def signal_handler(sig, frame):
-    """Обработчик сигнала завершения (Ctrl+C)"""
-    global client, monitoring_task
-    
-    print("\n\n🛑 Получен сигнал завершения, останавливаем бот...")
-    
-    if client:
-        client.stop_control_loop()
-    
-    if monitoring_task and not monitoring_task.done():
-        monitoring_task.cancel()
-    
-    print("✅ Бот остановлен")
-    sys.exit(0)
+        n_ticks = int(context.args[0]) if context.args else 1
+        if n_ticks <= 0:
+            await update.message.reply_text("❌ Число тиков должно быть > 0")
+            return
+        
+        reply = await engine.request("memprofile", n_ticks=n_ticks)
+        if not reply["ok"]:
+            await update.message.reply_text(f"❌ Ошибка: {reply['error']}")
+            return
+        
+        await update.message.reply_text(f"🔬 tracemalloc включен на {n_ticks} тиков, отчет придет после них")
+        if not reply["monitoring"]:
+            await update.message.reply_text("⚠️ Мониторинг не запущен - профиль начнется после /start_monitoring")
+        
+    except ValueError:
+        await update.message.reply_text("❌ Неверный формат числа")
 
 
-def main():
-    global client
+async def send_event(application: Application, event: dict):
+    chat_id = event.get("chat_id") or ALLOWED_USER_ID
     
+    # Отчеты профилировщика длинные - отправляем файлом
+    if event["type"] == "profile":
+        document = io.BytesIO(event["text"].encode())
+        await application.bot.send_document(chat_id=chat_id, document=document, filename=event["filename"])
+        return
+    
+    await application.bot.send_message(chat_id=chat_id, text=event["text"])
+
+
+async def forward_events(application: Application):
+    """Пересылка событий движка в Telegram. Переподключается, если движок перезапущен"""
+    while True:
+        try:
+            async for event in engine.events():
+                try:
+                    await send_event(application, event)
+                except Exception as e:
+                    # Сбой Telegram не должен рвать поток событий
+                    print(f"⚠️  Не удалось отправить сообщение: {e}")
+        except (FileNotFoundError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"⚠️  Ошибка пересылки событий: {e}")
+        
+        await asyncio.sleep(5)
+
+
+async def post_init(application: Application):
+    application.create_task(forward_events(application))
+
+
+def main():
     if not BOT_TOKEN:
         print("❌ TELEGRAM_BOT_TOKEN не установлен в .env")
         print("\nДобавьте в .env:")
@@ -341,24 +345,11 @@ def main():
         print("❌ TELEGRAM_USER_ID не установлен в .env")
         return
     
-    # Регистрируем обработчик сигнала Ctrl+C
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     print("🤖 Запуск Telegram бота...")
     print(f"   Разрешенный пользователь ID: {ALLOWED_USER_ID}")
+    print(f"   Сокет движка: {engine.path}")
     
-    # Инициализация клиента при старте (займет время один раз)
-    print("⏳ Инициализация Hyperliquid клиента...")
-    try:
-        client = HyperliquidClient()
-        print("✅ Клиент инициализирован")
-    except Exception as e:
-        print(f"⚠️  Не удалось инициализировать клиент: {e}")
-        print("   Клиент будет создан при первом использовании")
-        client = None
-    
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
     
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("set_deviation", set_deviation_command))
@@ -367,17 +358,19 @@ def main():
     application.add_handler(CommandHandler("start_monitoring", start_monitoring_command))
     application.add_handler(CommandHandler("stop_monitoring", stop_monitoring_command))
     application.add_handler(CommandHandler("status", status_command))
+    application.add_handler(CommandHandler("risk", risk_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("memprofile", memprofile_command))
     
     print("✅ Telegram бот запущен!")
     print("   Нажмите Ctrl+C для остановки\n")
     
+    # Остановка бота не останавливает хеджер - он живет в своем процессе
     try:
         application.run_polling()
     except KeyboardInterrupt:
         print("\n🛑 Остановка бота...")
     finally:
-        if client:
-            client.stop_control_loop()
         print("✅ Бот остановлен")
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import pytest
+
+
+def _levels(levels):
+    return [{"px": str(px), "sz": str(sz), "n": 1} for px, sz in levels]
+
+
+@pytest.fixture
+def l2_snapshot():
+    """Снапшот в формате Info.l2_snapshot из списков (px, sz)"""
+    def build(bids, asks, coin="ETH"):
+        return {"coin": coin, "levels": [_levels(bids), _levels(asks)]}
+    return build
+
+
+@pytest.fixture
+def l2_info(l2_snapshot):
+    """Info, у которого l2_snapshot всегда отдает один и тот же стакан"""
+    class StaticInfo:
+        def __init__(self, bids, asks):
+            self.snapshot = l2_snapshot(bids, asks)
+
+        def l2_snapshot(self, name):
+            return self.snapshot
+
+    return StaticInfo
+
+
+@pytest.fixture
+def order_response():
+    """Ответ exchange.order со статусом одного ордера"""
+    def build(status):
+        return {"status": "ok", "response": {"type": "order", "data": {"statuses": [status]}}}
+    return build
+
+
+@pytest.fixture
+def first_status():
+    """Статус ордера из ответа exchange.order"""
+    def get(result):
+        assert result["status"] == "ok"
+        return result["response"]["data"]["statuses"][0]
+    return get
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("web3")
+
+from eth_abi import encode
+from web3 import Web3
+
+from ekubo_config import CORE_CONTRACT, POSITION_ID, POSITIONS_CONTRACT, TOKEN0, TOKEN1, CONFIG, LOWER_TICK, UPPER_TICK
+from ekubo_indexer import EkuboIndexer
+
+POOL_KEY = (TOKEN0, TOKEN1, bytes.fromhex(CONFIG[2:]))
+BOUNDS = (LOWER_TICK, UPPER_TICK)
+UPDATED_TYPES = ["address", "(address,address,bytes32)", "(bytes32,(int32,int32),int128)", "int128", "int128"]
+FEES_TYPES = ["(address,address,bytes32)", "(bytes32,address,(int32,int32))", "uint128", "uint128"]
+
+
+@pytest.fixture
+def indexer():
+    return EkuboIndexer(w3=Web3(), db_path=":memory:")
+
+
+def core_log(topic, types, values, block):
+    return {
+        "address": CORE_CONTRACT,
+        "topics": [bytes.fromhex(topic[2:])],
+        "data": encode(types, values),
+        "blockNumber": block,
+        "logIndex": 0,
+        "transactionHash": b"\x11" * 32,
+        "blockHash": b"\x22" * 32,
+        "transactionIndex": 0,
+        "removed": False,
+    }
+
+
+def updated(indexer, salt, liquidity_delta, delta0, delta1, block):
+    values = [POSITIONS_CONTRACT, POOL_KEY, (salt, BOUNDS, liquidity_delta), delta0, delta1]
+    return core_log(indexer.core_topics[0], UPDATED_TYPES, values, block)
+
+
+def test_core_logs_are_filtered_by_position_events(indexer):
+    core_filter = indexer._log_filters(1, 2)[1]
+
+    assert core_filter["address"] == CORE_CONTRACT
+    assert core_filter["topics"] == [indexer.core_topics]
+    assert len(indexer.core_topics) == 2
+
+
+def test_position_history(indexer):
+    salt = POSITION_ID.to_bytes(32, "big")
+    fees = core_log(indexer.core_topics[1], FEES_TYPES, [POOL_KEY, (salt, POSITIONS_CONTRACT, BOUNDS), 10**15, 3 * 10**6], 11)
+    logs = [
+        updated(indexer, salt, 10**20, 5 * 10**17, 1500 * 10**6, 10),
+        fees,
+        # Чужая позиция в том же пуле
+        updated(indexer, b"\x01" * 32, 10**20, 1, 1, 12),
+        updated(indexer, salt, -4 * 10**19, -2 * 10**17, -600 * 10**6, 13),
+    ]
+
+    assert indexer._store(logs) == 3
+
+    state = indexer.position_at(13)
+    assert state["liquidity"] == 6 * 10**19
+    assert (state["deposited0"], state["deposited1"]) == (3 * 10**17, 900 * 10**6)
+    assert (state["fees0"], state["fees1"]) == (10**15, 3 * 10**6)
+    assert state["events"] == {"PositionUpdated": 2, "PositionFeesCollected": 1}
+
+    assert indexer.position_at(10)["liquidity"] == 10**20
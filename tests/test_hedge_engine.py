@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("hyperliquid")
+
+from hedge_engine import HedgeEngine
+from order_tracker import OrderTracker
+
+VALID = {
+    "time": 1700000000.0,
+    "deviation": 0.004,
+    "timeout": 15,
+    "delta": 1.0,
+    "monitoring": True,
+    "chat_id": 1,
+    "last_decision": {"action": "increase"},
+    "pending_orders": [{
+        "cloid": "0x" + "00" * 16, "is_buy": False, "sz": 0.1, "reduce_only": False,
+        "filled": 0.0, "status": "sent", "sent_at": 1700000000.0,
+    }],
+}
+
+
+def engine_with_checkpoint(tmp_path, content):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    return HedgeEngine(socket_path=str(tmp_path / "engine.sock"), checkpoint_path=str(path))
+
+
+def test_valid_checkpoint_is_loaded(tmp_path):
+    assert engine_with_checkpoint(tmp_path, VALID).load_checkpoint() == VALID
+
+
+def test_missing_checkpoint(tmp_path):
+    engine = HedgeEngine(checkpoint_path=str(tmp_path / "missing.json"))
+
+    assert engine.load_checkpoint() is None
+
+
+@pytest.mark.parametrize("content", [
+    "{}",
+    "[]",
+    "{\"deviation\": 0.004",
+    {**VALID, "delta": "1.0"},
+    {key: value for key, value in VALID.items() if key != "timeout"},
+    {**VALID, "last_decision": "increase"},
+    {**VALID, "pending_orders": {}},
+    {**VALID, "pending_orders": [{"cloid": "0x00"}]},
+])
+def test_bad_checkpoint_is_skipped(tmp_path, content):
+    assert engine_with_checkpoint(tmp_path, content).load_checkpoint() is None
+
+
+
+class LoopClient:
+    def __init__(self):
+        self.control_loop_flag = False
+        self.tracker = OrderTracker()
+
+    def start_control_loop(self):
+        self.control_loop_flag = True
+
+    def stop_control_loop(self):
+        self.control_loop_flag = False
+
+    def get_timeout(self):
+        return 60
+
+
+def test_leftover_wake_does_not_skip_first_pause(tmp_path, monkeypatch):
+    async def scenario():
+        engine = HedgeEngine(checkpoint_path=str(tmp_path / "checkpoint.json"))
+        engine.client = LoopClient()
+        monkeypatch.setattr(engine, "save_checkpoint", lambda: None)
+        ticks = []
+        monkeypatch.setattr(engine.profiler, "run", lambda func: (ticks.append(func), ("tick", []))[1])
+
+        # Остался от /stop_monitoring, пришедшего посреди прошлого тика
+        engine._wake.set()
+        await engine.cmd_start_monitoring()
+        await asyncio.sleep(0.2)
+
+        assert len(ticks) == 1
+        await engine.cmd_stop_monitoring()
+
+    asyncio.run(scenario())
+
+
+class FundingClient:
+    def get_funding_rate(self):
+        return 0.0001
+
+
+@pytest.mark.parametrize("szi, short", [("-0.5", 0.5), ("0.5", -0.5)])
+def test_snapshot_keeps_position_sign(tmp_path, szi, short):
+    engine = HedgeEngine(checkpoint_path=str(tmp_path / "checkpoint.json"))
+    engine.client = FundingClient()
+
+    engine._update_snapshot(3000.0, True, (1.0, 3000.0), {"szi": szi})
+
+    assert engine.snapshot["short"] == short
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("hyperliquid")
+
+from hyperliquid_client import HyperliquidClient, MIN_ORDER_USD
+from order_submitter import OrderSubmitter, _to_wire
+from orderbook import L2BookCache
+
+
+@pytest.fixture
+def submitter():
+    s = OrderSubmitter(wallet=None)
+    s.assets = {"ETH": (1, 4), "BTC": (0, 5), "PEPE": (9, 0)}
+    yield s
+    s.stop()
+
+
+@pytest.mark.parametrize("name, px, is_buy, expected", [
+    ("ETH", 3000.55, True, "3000.6"),
+    ("ETH", 3000.55, False, "3000.5"),
+    ("ETH", 3000.0, True, "3000"),
+    ("ETH", 999.123, True, "999.13"),
+    ("ETH", 999.123, False, "999.12"),
+    # Целая цена допустима даже при 6 значащих цифрах
+    ("BTC", 112345.6, True, "112346"),
+    ("BTC", 112345.6, False, "112345"),
+    ("PEPE", 1.234567e-05, False, "0.000012"),
+    ("PEPE", 1.234567e-05, True, "0.000013"),
+])
+def test_quantize_price(submitter, name, px, is_buy, expected):
+    assert _to_wire(submitter.quantize_price(name, px, is_buy)) == expected
+
+
+def test_quantize_price_never_narrows_limit(submitter):
+    for px in (1891.37, 2999.99, 3001.234, 45.6789):
+        assert submitter.quantize_price("ETH", px, True) >= Decimal(str(px))
+        assert submitter.quantize_price("ETH", px, False) <= Decimal(str(px))
+
+
+def test_builder_is_refused(submitter):
+    with pytest.raises(ValueError):
+        submitter.order("ETH", True, 0.01, 3000, {"limit": {"tif": "Ioc"}}, builder={"b": "0x0", "f": 10})
+
+
+@pytest.fixture
+def client(l2_info):
+    # Только стакан: сеть и ключи для plan_order не нужны
+    client = HyperliquidClient.__new__(HyperliquidClient)
+    client.book = L2BookCache(l2_info([(3000.07, 0.5), (2990.03, 1)], [(3000.13, 0.2), (3001.17, 5)]), ttl=60)
+    return client
+
+
+def test_plan_order_leaves_rounding_to_submitter(client):
+    size, limit_px = client.plan_order(False, 1.23456)
+    assert size == pytest.approx(1.23456)
+    assert limit_px == 2990.03
+
+    assert client.plan_order(True, 0.34567) == (0.34567, 3001.17)
+
+
+@pytest.mark.parametrize("is_buy", [True, False])
+def test_min_order_survives_quantization(client, submitter, is_buy):
+    size, limit_px = client.plan_order(is_buy, 0.0001)
+
+    wire_size = submitter.quantize_size("ETH", size)
+    wire_px = submitter.quantize_price("ETH", limit_px, is_buy)
+    assert wire_size * wire_px >= MIN_ORDER_USD
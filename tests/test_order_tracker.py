@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("hyperliquid")
+
+from order_tracker import OrderTracker
+
+
+def registered(is_buy=False, sz=1.0):
+    tracker = OrderTracker()
+    cloid = tracker.new_cloid()
+    tracker.register(cloid, is_buy, sz, reduce_only=False)
+    return tracker, cloid
+
+
+def order_state(tracker, cloid):
+    return tracker.orders[cloid.to_raw()]["status"]
+
+
+def test_unanswered_order_counts_in_full():
+    tracker, _ = registered(is_buy=False, sz=1.0)
+
+    assert tracker.has_unresolved()
+    assert tracker.pending_short_delta() == 1.0
+
+
+def test_filled_counts_only_filled_part(order_response):
+    tracker, cloid = registered(is_buy=False, sz=1.0)
+
+    tracker.apply_response(cloid, order_response({"filled": {"totalSz": "0.4", "avgPx": "3000", "oid": 1}}))
+
+    assert order_state(tracker, cloid) == "filled"
+    assert not tracker.has_unresolved()
+    assert tracker.pending_short_delta() == 0.4
+
+
+def test_resting_buy_reduces_short(order_response):
+    tracker, cloid = registered(is_buy=True, sz=0.5)
+
+    tracker.apply_response(cloid, order_response({"resting": {"oid": 1}}))
+
+    assert order_state(tracker, cloid) == "open"
+    assert tracker.pending_short_delta() == -0.5
+
+
+def test_status_error_is_rejected(order_response):
+    tracker, cloid = registered()
+
+    tracker.apply_response(cloid, order_response({"error": "Order could not immediately match"}))
+
+    assert order_state(tracker, cloid) == "rejected"
+    assert tracker.pending_short_delta() == 0
+
+
+@pytest.mark.parametrize("order_result", [
+    {"status": "err", "response": "User or API Wallet does not exist."},
+    {"status": "ok", "response": "unexpected"},
+    "garbage",
+    None,
+])
+def test_err_reply_is_rejected(order_result):
+    tracker, cloid = registered()
+
+    tracker.apply_response(cloid, order_result)
+
+    assert order_state(tracker, cloid) == "rejected"
+    assert not tracker.has_unresolved()
+
+
+def test_unknown_cloid_is_ignored(order_response):
+    tracker, _ = registered()
+    other = tracker.new_cloid()
+
+    tracker.apply_response(other, order_response({"resting": {"oid": 1}}))
+
+    assert other.to_raw() not in tracker.orders
@@ -0,0 +1,45 @@
+import pytest
+
+from orderbook import L2BookCache
+
+
+@pytest.fixture
+def make_book(l2_info):
+    def make(bids, asks, max_slippage=0.005):
+        return L2BookCache(l2_info(bids, asks), ttl=60, max_slippage=max_slippage)
+    return make
+
+
+# mid = 3000, кап 0.5%: 2985 для продажи, 3015 для покупки
+BIDS = [(2999.5, 0.5), (2990, 1), (2900, 9)]
+ASKS = [(3000.5, 0.2), (3001, 5), (3100, 9)]
+
+
+def test_limit_is_worst_level_needed(make_book):
+    assert make_book(BIDS, ASKS).plan_order(False, 1.0) == (2990.0, 1.0, 2994.75)
+
+
+def test_buy_walks_asks(make_book):
+    limit_px, size, avg_px = make_book(BIDS, ASKS).plan_order(True, 1.0)
+
+    assert (limit_px, size) == (3001.0, 1.0)
+    assert avg_px == (0.2 * 3000.5 + 0.8 * 3001) / 1.0
+
+
+def test_size_is_capped_to_liquidity_inside_slippage(make_book):
+    limit_px, size, _ = make_book(BIDS, ASKS).plan_order(False, 5)
+
+    # Уровень 2900 за капом 2985 - объем урезается
+    assert limit_px == 2990.0
+    assert size == 1.5
+
+
+def test_best_level_beyond_cap_returns_cap_price(make_book):
+    book = make_book([(2900, 5)], [(3100, 5)])
+
+    assert book.plan_order(False, 1.0) == (3000 * 0.995, 1.0, 3000 * 0.995)
+    assert book.plan_order(True, 1.0) == (3000 * 1.005, 1.0, 3000 * 1.005)
+
+
+def test_empty_book(make_book):
+    assert make_book([], []).plan_order(True, 1.0) == (0.0, 1.0, 0.0)
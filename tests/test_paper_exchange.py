@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from paper_exchange import PaperExchange, RecordedBookSource
+
+
+@pytest.fixture
+def make_exchange(tmp_path, l2_snapshot):
+    """PaperExchange на записанных снапшотах: каждый аргумент - (bids, asks)"""
+    def make(*books, **kwargs):
+        path = tmp_path / "book.jsonl"
+        path.write_text("\n".join(json.dumps({"book": l2_snapshot(bids, asks)}) for bids, asks in books))
+        exchange = PaperExchange(RecordedBookSource(str(path)), **kwargs)
+        exchange.advance()
+        return exchange
+    return make
+
+
+IOC = {"limit": {"tif": "Ioc"}}
+ALO = {"limit": {"tif": "Alo"}}
+
+
+def test_ioc_sweeps_levels_and_opens_short(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1), (2999, 2)], [(3000.5, 1)]))
+
+    status = first_status(exchange.order("ETH", False, 1.5, 2990, IOC))
+
+    assert status["filled"]["totalSz"] == "1.5"
+    assert float(status["filled"]["avgPx"]) == pytest.approx(4499.0 / 1.5)
+    assert exchange.szi == -1.5
+    assert exchange.entry_px == pytest.approx(4499.0 / 1.5)
+    assert exchange.fees_paid == pytest.approx(4499.0 * 0.00045)
+    assert exchange.balance == pytest.approx(10000 - 4499.0 * 0.00045)
+
+
+def test_consumed_liquidity_is_not_reused_within_snapshot(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1), (2999, 2)], [(3000.5, 1)]))
+
+    exchange.order("ETH", False, 1.5, 2990, IOC)
+    status = first_status(exchange.order("ETH", False, 1.0, 2990, IOC))
+
+    # 2999.5 уже снят первым ордером
+    assert float(status["filled"]["avgPx"]) == 2999
+    assert exchange.szi == -2.5
+
+
+def test_ioc_outside_limit_is_rejected(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1)], [(3000.5, 1)]))
+
+    status = first_status(exchange.order("ETH", False, 1.0, 3000, IOC))
+
+    assert "error" in status
+    assert exchange.szi == 0
+    assert exchange.fill_count == 0
+
+
+def test_reduce_only_is_capped_and_realizes_pnl(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1), (2999, 2)], [(3000.5, 1), (3001, 5)]))
+    exchange.order("ETH", False, 1.5, 2990, IOC)
+
+    status = first_status(exchange.order("ETH", True, 5, 3100, IOC, reduce_only=True))
+
+    assert status["filled"]["totalSz"] == "1.5"
+    assert exchange.szi == 0
+    assert exchange.entry_px == 0
+    assert exchange.realized_pnl == pytest.approx(4499.0 - 4501.0)
+    assert exchange.user_state()["assetPositions"] == []
+
+
+def test_reduce_only_on_flat_position_is_rejected(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1)], [(3000.5, 1)]))
+
+    status = first_status(exchange.order("ETH", True, 1, 3100, IOC, reduce_only=True))
+
+    assert "error" in status
+
+
+def test_alo_rests_and_fills_at_own_price_on_next_snapshot(make_exchange, first_status):
+    exchange = make_exchange(
+        ([(2999, 1)], [(3001, 1)]),
+        ([(2999, 1)], [(2999.8, 2)]),
+    )
+
+    status = first_status(exchange.order("ETH", True, 1, 3000, ALO))
+    assert "resting" in status
+    assert exchange.szi == 0
+
+    exchange.advance()
+
+    assert exchange.resting == []
+    assert exchange.szi == 1
+    assert exchange.entry_px == 3000
+    assert exchange.fees_paid == pytest.approx(3000 * 0.00015)
+
+
+def test_user_state_reports_signed_size(make_exchange, first_status):
+    exchange = make_exchange(([(2999.5, 1), (2999, 2)], [(3000.5, 1)]))
+    exchange.order("ETH", False, 1.5, 2990, IOC)
+
+    position = exchange.user_state()["assetPositions"][0]["position"]
+
+    assert position["coin"] == "ETH"
+    assert float(position["szi"]) == -1.5
@@ -0,0 +1,92 @@
+import tracemalloc
+
+import pytest
+
+import profiler
+from profiler import TickProfiler
+
+
+@pytest.fixture(autouse=True)
+def no_tracemalloc():
+    assert not tracemalloc.is_tracing()
+    yield
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_run_without_profiling():
+    assert TickProfiler().run(lambda: "tick") == ("tick", [])
+
+
+def test_cpu_report_after_n_ticks():
+    p = TickProfiler()
+    p.start_cpu(2)
+
+    assert p.run(lambda: 1) == (1, [])
+    result, reports = p.run(lambda: 2)
+
+    assert result == 2
+    assert [name for name, _ in reports] == ["cpu_profile_2_ticks.txt"]
+    assert "cProfile за 2 тиков" in reports[0][1]
+    # Профиль закончен - следующий заказ принимается
+    p.start_cpu(1)
+
+
+def test_start_cpu_during_tick_begins_with_next_tick():
+    p = TickProfiler()
+
+    _, reports = p.run(lambda: p.start_cpu(1))
+    assert reports == []
+
+    _, reports = p.run(lambda: None)
+    assert [name for name, _ in reports] == ["cpu_profile_1_ticks.txt"]
+
+
+def test_second_start_is_refused():
+    p = TickProfiler()
+    p.start_cpu(3)
+    with pytest.raises(RuntimeError):
+        p.start_cpu(1)
+
+    p.start_mem(3)
+    with pytest.raises(RuntimeError):
+        p.start_mem(1)
+
+
+def test_tracemalloc_starts_with_first_profiled_tick():
+    p = TickProfiler()
+    p.start_mem(2)
+    assert not tracemalloc.is_tracing()
+
+    _, reports = p.run(lambda: [0] * 1000)
+    assert reports == []
+    assert tracemalloc.is_tracing()
+
+    _, reports = p.run(lambda: None)
+    assert [name for name, _ in reports] == ["mem_profile_2_ticks.txt"]
+    assert not tracemalloc.is_tracing()
+
+
+def test_stop_turns_off_tracemalloc():
+    p = TickProfiler()
+    p.start_mem(5)
+    p.run(lambda: None)
+
+    p.stop()
+
+    assert not tracemalloc.is_tracing()
+    assert p.run(lambda: None) == (None, [])
+
+
+def test_report_failure_does_not_raise(monkeypatch):
+    def broken_stats(*args, **kwargs):
+        raise TypeError("нет данных")
+
+    monkeypatch.setattr(profiler.pstats, "Stats", broken_stats)
+    p = TickProfiler()
+    p.start_cpu(1)
+
+    result, reports = p.run(lambda: "tick")
+
+    assert result == "tick"
+    assert reports == [("cpu_profile_1_ticks.txt", "Не удалось построить отчет: нет данных")]
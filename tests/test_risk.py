@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from risk import format_risk_table, liquidity_from_amounts, lp_amounts, risk_grid, tick_to_price
+from ekubo_config import LOWER_TICK, UPPER_TICK
+
+PA, PB = tick_to_price(LOWER_TICK), tick_to_price(UPPER_TICK)
+LIQUIDITY = 5000.0
+
+
+@pytest.mark.parametrize("price", [PA * 0.9, PA, (PA + PB) / 2, PB, PB * 1.1])
+def test_liquidity_round_trip(price):
+    eth, usdc = lp_amounts(np.array([price]), LIQUIDITY, PA, PB)
+
+    assert liquidity_from_amounts(eth[0], usdc[0], price, PA, PB) == pytest.approx(LIQUIDITY)
+
+
+def test_below_range_is_all_eth():
+    eth, usdc = lp_amounts(np.array([PA * 0.8, PA * 0.9]), LIQUIDITY, PA, PB)
+
+    assert usdc == pytest.approx([0, 0])
+    assert eth[0] == eth[1] == pytest.approx(LIQUIDITY * (1 / np.sqrt(PA) - 1 / np.sqrt(PB)))
+
+
+def test_above_range_is_all_usdc():
+    eth, usdc = lp_amounts(np.array([PB * 1.1, PB * 1.2]), LIQUIDITY, PA, PB)
+
+    assert eth == pytest.approx([0, 0])
+    assert usdc[0] == usdc[1] == pytest.approx(LIQUIDITY * (np.sqrt(PB) - np.sqrt(PA)))
+
+
+def test_in_range_eth_falls_as_price_rises():
+    prices = np.linspace(PA, PB, 50)
+    eth, usdc = lp_amounts(prices, LIQUIDITY, PA, PB)
+
+    assert np.all(np.diff(eth) < 0)
+    assert np.all(np.diff(usdc) > 0)
+
+
+def make_grid(short=None, delta=1.0, funding_rate=0.0):
+    price = (PA + PB) / 2
+    eth, usdc = lp_amounts(np.array([price]), LIQUIDITY, PA, PB)
+    if short is None:
+        short = eth[0] * delta
+    return risk_grid(price, eth[0], usdc[0], short, delta, funding_rate, max_move=0.3, n_prices=61, max_hours=24)
+
+
+def test_grid_starts_flat_and_hedged():
+    grid = make_grid()
+    zero = int(np.abs(grid["moves"]).argmin())
+
+    assert grid["pnl"][zero, 0] == pytest.approx(0, abs=1e-6)
+    assert grid["net_delta"][zero] == pytest.approx(0, abs=1e-9)
+    assert grid["rehedge_size"][zero] == pytest.approx(0, abs=1e-9)
+
+
+def test_target_short_flips_to_minimum_above_range():
+    grid = make_grid(delta=0.8)
+    above = grid["prices"] > PB
+    inside = (grid["prices"] > PA) & (grid["prices"] < PB)
+
+    assert above.any()
+    assert grid["rehedge_size"][above] == pytest.approx(0.001 - grid["short"])
+    assert grid["rehedge_size"][inside] == pytest.approx(grid["lp_eth"][inside] * 0.8 - grid["short"])
+
+
+def test_long_position_keeps_its_sign():
+    grid = make_grid(short=-0.5, funding_rate=0.0001)
+    up = int(grid["moves"].argmax())
+
+    # Лонг зарабатывает на росте и платит положительный фандинг
+    assert grid["short_pnl"][up] > 0
+    assert grid["funding"][up, -1] < 0
+    assert grid["net_delta"][up] == pytest.approx(grid["lp_eth"][up] + 0.5)
+
+
+def test_format_risk_table():
+    text = format_risk_table(make_grid())
+
+    assert f"Диапазон ${PA:.0f} - ${PB:.0f}" in text
+    assert len(text.splitlines()) == 5 + 9